@@ -0,0 +1,196 @@
+"""Align scene text to a word-level transcript in one pass.
+
+Both sides are normalized into token arrays and aligned with a patience-style diff:
+tokens (or, in repetitive stretches, short n-grams) that occur exactly once in both sequences
+become anchors, the longest increasing chain of anchors is kept, and the same step recurses
+into the gaps between anchors until they are small enough for an exact LCS table. In practice
+this is close to O(n log n) for n words.
+"""
+import re
+from bisect import bisect_left
+
+MAX_GAP_DP_CELLS = 40000  # Largest gap (scene tokens x transcript tokens) solved with a full LCS table
+MAX_ANCHOR_NGRAM = 4  # Longest n-gram tried when no single token is unique in a gap
+BOUNDARY_WINDOW = 5  # Tokens at the start of a scene used to score its boundary
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_token(word):
+    """Lowercase and drop punctuation so "Don't," and "dont" compare equal"""
+    return _NON_WORD.sub("", word.lower())
+
+
+def tokenize(text):
+    return [token for token in (normalize_token(word) for word in text.split()) if token]
+
+
+def _longest_increasing_chain(pairs):
+    """Longest subsequence of (i, j) pairs (sorted by i) whose j is strictly increasing"""
+    tails = []  # tails[k] = smallest j ending a chain of length k + 1
+    tail_index = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        k = bisect_left(tails, j)
+        if k == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[k] = j
+            tail_index[k] = index
+        previous[index] = tail_index[k - 1] if k else -1
+
+    chain = []
+    index = tail_index[-1] if tail_index else -1
+    while index != -1:
+        chain.append(pairs[index])
+        index = previous[index]
+    chain.reverse()
+    return chain
+
+
+def _unique_ngrams(tokens, start, end, n):
+    """n-grams that occur exactly once in tokens[start:end], mapped to their position"""
+    positions = {}
+    counts = {}
+    for index in range(start, end - n + 1):
+        gram = tuple(tokens[index:index + n])
+        counts[gram] = counts.get(gram, 0) + 1
+        positions[gram] = index
+    return {gram: positions[gram] for gram, count in counts.items() if count == 1}
+
+
+def _find_anchors(a, a_start, a_end, b, b_start, b_end):
+    """Non-overlapping chain of unique n-gram matches, trying single tokens first"""
+    for n in range(1, MAX_ANCHOR_NGRAM + 1):
+        unique_a = _unique_ngrams(a, a_start, a_end, n)
+        unique_b = _unique_ngrams(b, b_start, b_end, n)
+        candidates = sorted((i, unique_b[gram]) for gram, i in unique_a.items() if gram in unique_b)
+        anchors = []
+        for i, j in _longest_increasing_chain(candidates):
+            if not anchors or (i >= anchors[-1][0] + n and j >= anchors[-1][1] + n):
+                anchors.append((i, j))
+        if anchors:
+            return anchors, n
+    return [], 0
+
+
+def _lcs_pairs(a, a_start, a_end, b, b_start, b_end):
+    """Exact LCS for a small gap"""
+    rows = a_end - a_start
+    cols = b_end - b_start
+    table = [[0] * (cols + 1) for _ in range(rows + 1)]
+    for i in range(rows - 1, -1, -1):
+        row = table[i]
+        next_row = table[i + 1]
+        token = a[a_start + i]
+        for j in range(cols - 1, -1, -1):
+            if token == b[b_start + j]:
+                row[j] = next_row[j + 1] + 1
+            else:
+                row[j] = max(next_row[j], row[j + 1])
+
+    pairs = []
+    i = j = 0
+    while i < rows and j < cols:
+        if a[a_start + i] == b[b_start + j]:
+            pairs.append((a_start + i, b_start + j))
+            i += 1
+            j += 1
+        elif table[i + 1][j] >= table[i][j + 1]:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+
+def align_tokens(a, b):
+    """Return matched (index_in_a, index_in_b) pairs, increasing in both"""
+    pairs = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_start, a_end, b_start, b_end = stack.pop()
+
+        # Common prefix and suffix match directly
+        while a_start < a_end and b_start < b_end and a[a_start] == b[b_start]:
+            pairs.append((a_start, b_start))
+            a_start += 1
+            b_start += 1
+        while a_start < a_end and b_start < b_end and a[a_end - 1] == b[b_end - 1]:
+            a_end -= 1
+            b_end -= 1
+            pairs.append((a_end, b_end))
+        if a_start >= a_end or b_start >= b_end:
+            continue
+
+        if (a_end - a_start) * (b_end - b_start) <= MAX_GAP_DP_CELLS:
+            pairs.extend(_lcs_pairs(a, a_start, a_end, b, b_start, b_end))
+            continue
+
+        anchors, n = _find_anchors(a, a_start, a_end, b, b_start, b_end)
+        if not anchors:
+            continue  # Too big and too repetitive - leave the gap unaligned
+
+        # Recurse into the gaps around each anchor
+        previous_a, previous_b = a_start, b_start
+        for i, j in anchors:
+            pairs.extend((i + offset, j + offset) for offset in range(n))
+            stack.append((previous_a, i, previous_b, j))
+            previous_a, previous_b = i + n, j + n
+        stack.append((previous_a, a_end, previous_b, b_end))
+
+    pairs.sort()
+    return pairs
+
+
+def align_scenes(scene_texts, transcript_words):
+    """Map every scene to its span of transcript words.
+
+    Returns one dict per scene with 'first_word' / 'last_word' (indices into transcript_words,
+    or None if nothing matched) and 'confidence' (0-1, share of the scene's opening tokens
+    that matched in order).
+    """
+    # Scene tokens, flattened, remembering which scene each token came from
+    scene_tokens = []
+    scene_ranges = []
+    for text in scene_texts:
+        start = len(scene_tokens)
+        scene_tokens.extend(tokenize(text))
+        scene_ranges.append((start, len(scene_tokens)))
+
+    # Transcript tokens, remembering which word each came from (punctuation-only words drop out)
+    transcript_tokens = []
+    token_to_word = []
+    for word_index, word in enumerate(transcript_words):
+        token = normalize_token(word)
+        if token:
+            transcript_tokens.append(token)
+            token_to_word.append(word_index)
+
+    matched = [None] * len(scene_tokens)
+    for i, j in align_tokens(scene_tokens, transcript_tokens):
+        matched[i] = j
+
+    spans = []
+    previous_end = -1  # Last transcript token claimed by an earlier scene
+    for start, end in scene_ranges:
+        hits = [(i, matched[i]) for i in range(start, end) if matched[i] is not None]
+        if not hits:
+            spans.append({'first_word': None, 'last_word': None, 'confidence': 0.0})
+            continue
+
+        # Unmatched leading/trailing tokens are assumed to be spoken right next to the matched ones
+        first_i, first_j = hits[0]
+        last_i, last_j = hits[-1]
+        first_token = min(first_j, max(previous_end + 1, first_j - (first_i - start)))
+        last_token = min(len(transcript_tokens) - 1, last_j + (end - 1 - last_i))
+        previous_end = last_token
+
+        window = min(BOUNDARY_WINDOW, end - start)
+        window_hits = sum(1 for i, _ in hits if i < start + window)
+        spans.append({
+            'first_word': token_to_word[first_token],
+            'last_word': token_to_word[last_token],
+            'confidence': round(window_hits / window, 2),
+        })
+    return spans
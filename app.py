@@ -1,18 +1,40 @@
 import streamlit as st
 import os
-from datetime import datetime
+import copy
 from pathlib import Path
-import anthropic
-from google import genai
-from elevenlabs import ElevenLabs
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
-import subprocess
 
-# Load environment variables from .env file if it exists
+# Load environment variables from .env file if it exists - before the project modules,
+# which read their settings (cache dirs, concurrency, PROVIDER_BACKEND...) at import time
 load_dotenv()
 
+from rate_limit import all_limiter_stats
+from run_manifest import RunManifest, find_runs, text_hash
+from jobs import get_job_manager
+from veo_latency import get_latency_tracker
+from thumbnails import get_thumbnail
+from run_metrics import RunMetrics, METRICS_FILE, activate, summarize, total_wall_seconds
+from run_metrics import load as load_run_metrics
+from run_estimate import estimate_video_run, describe_estimate, format_duration
+from rough_cut import ROUGH_CUT_FILE
+from pipeline import (
+    OUTPUTS_ROOT,
+    generate_narrative,
+    break_into_scenes,
+    generate_video,
+    generate_image,
+    create_output_folder,
+    generate_assets,
+    prepare_video_plan,
+    load_video_plan,
+    plan_targets,
+    check_ffmpeg,
+    render_rough_cut,
+)
+
+SCENES_PER_PAGE = int(os.getenv("SCENES_PER_PAGE", "10"))  # Scene editor page size
+
 # Load character info from file if it exists
 character_info_file = Path("characters.txt")
 default_character_info = ""
@@ -40,10 +62,29 @@ elevenlabs_key = st.sidebar.text_input(
     value=os.getenv("ELEVENLABS_API_KEY", ""),
     type="password"
 )
-openai_key = st.sidebar.text_input(
-    "OpenAI API Key (optional - for future features)", 
-    value=os.getenv("OPENAI_API_KEY", ""),
-    type="password"
+
+st.sidebar.header("Generation Settings")
+image_concurrency = st.sidebar.number_input(
+    "Parallel image requests",
+    min_value=1,
+    max_value=16,
+    value=int(os.getenv("IMAGE_CONCURRENCY", "4")),
+    step=1,
+    help="How many scene images are generated at the same time. Lower this if you keep hitting rate limits."
+)
+video_concurrency = st.sidebar.number_input(
+    "Parallel video scenes",
+    min_value=1,
+    max_value=32,
+    value=int(os.getenv("VIDEO_CONCURRENCY", "4")),
+    step=1,
+    help="How many scenes' Veo generation/extension chains are kept in flight at once."
+)
+chunked_audio = st.sidebar.checkbox(
+    "Parallel chunked narration",
+    value=True,
+    help="Split long narratives at paragraph/sentence boundaries and synthesize the chunks at the same time. "
+         "Each chunk gets its neighbours' text as context, and the MP3s are joined without re-encoding."
 )
 
 st.title("🎬 Grief Video Generator")
@@ -96,539 +137,16 @@ if 'scenes' not in st.session_state:
     st.session_state.scenes = None
 if 'output_folder' not in st.session_state:
     st.session_state.output_folder = None
-
-def generate_narrative(raw_text, api_key):
-    """Convert stream of consciousness to poetic narrative"""
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=2000,
-        messages=[{
-            "role": "user",
-            "content": f"""Transform this stream of consciousness into a poetic, emotionally resonant narrative for a TikTok video about grief and healing. 
-
-Use poetic prose with challenging, abstract language. Don't simplify or dumb down the concepts - embrace complexity and depth. The language should be contemplative and intellectually engaging while maintaining raw emotional authenticity.
-
-Maintain the emotional weight and visceral honesty, but shape it into something that flows well when spoken aloud.
-
-IMPORTANT: Use only simple punctuation (periods, commas, question marks, exclamation points). Do not use em dashes or colons.
-
-Stream of consciousness:
-{raw_text}
-
-Return only the narrative, no preamble."""
-        }]
-    )
-    
-    return message.content[0].text
-
-def break_into_scenes(narrative, api_key, character_info=None, media_type="Images", art_direction=None):
-    """Break narrative into scenes with image/video prompts"""
-    client = anthropic.Anthropic(api_key=api_key)
-    
-    # Build the prompt with optional character info
-    character_context = ""
-    if character_info and character_info.strip():
-        char_prompt_type = "video" if media_type == "Videos" else "image"
-        character_context = f"""
-
-CHARACTER INFORMATION (use when relevant for {char_prompt_type} prompts):
-{character_info.strip()}
-
-CRITICAL INSTRUCTIONS FOR CHARACTER CONSISTENCY:
-- When a scene mentions a character, use their COMPLETE description VERBATIM (word-for-word)
-- DO NOT paraphrase, summarize, or abbreviate character descriptions
-- DO NOT change ages, physical features, or any details
-- Copy the ENTIRE character description directly into the prompt
-- This ensures the character looks consistent across all scenes
-
-Example:
-Character info: "Dean: Moderately heavy-set man in his late 40s with short black hair and short black unkempt beard, black-framed glasses"
-CORRECT prompt: "Moderately heavy-set man in his late 40s with short black hair and short black unkempt beard, black-framed glasses standing by window"
-WRONG prompt: "Man in his 50s with beard standing by window" (too vague, changes age)
-"""
-    
-    # Build art direction context
-    art_direction_context = ""
-    if art_direction and art_direction.strip():
-        prompt_type = "video_prompt" if media_type == "Videos" else "image_prompt"
-        art_direction_context = f"""
-
-ART DIRECTION / STYLE GUIDE (CRITICAL - apply to EVERY scene):
-{art_direction.strip()}
-
-IMPORTANT: Append this style guide to the end of EVERY {prompt_type}. 
-Format: "[scene visual description]. Style: {art_direction.strip()}"
-This ensures consistent visual aesthetic across all scenes.
-"""
-    
-    # Build media-specific instructions
-    if media_type == "Videos":
-        media_instructions = """
-For each scene, provide:
-1. The text to be spoken (use only simple punctuation - periods, commas, question marks, exclamation points. No em dashes or colons)
-   CRITICAL: Keep text to 20-25 words MAX per scene (to fit within 10-second video limit)
-2. A VIDEO generation prompt with THREE components:
-   a) Visual description (abstract, contemplative, emotionally resonant - not literal)
-   b) Camera movement (e.g., "slow zoom in", "gentle pan left", "drift forward", "static shot")
-   c) Ambient sounds (e.g., "soft rain, distant thunder", "crackling fire", "wind through trees", "gentle piano melody")
-   
-CRITICAL FOR VIDEO PROMPTS:
-- NO dialogue, speech, or talking in the video
-- NO text or words visible in the video
-- DO include atmospheric/environmental sounds
-- DO include camera movement suggestions
-- The video should be SILENT except for ambient audio (no voiceover)
-- IMPORTANT: In the JSON, keep all prompts on a SINGLE LINE (no line breaks within strings)
-
-CRITICAL FOR SCENE LENGTH:
-- Each scene's text should be 20-25 words maximum (roughly 8-10 seconds when spoken)
-- This means you'll need MORE SCENES than usual (20-30+ scenes is normal)
-- Break the narrative into smaller emotional beats
-- Don't compress multiple ideas into one scene
-
-Example video_prompt: "Abandoned playground swingset moving gently in breeze, rusted chains, overcast sky. Slow zoom out. Ambient sounds: creaking metal, soft wind, distant birds."
-
-Example of valid JSON (COPY THIS FORMAT EXACTLY):
-[
-  {
-    "scene_number": 1,
-    "text": "The weight settles in my chest.",
-    "video_prompt": "Abstract stones sinking through dark water. Slow drift downward. Ambient sounds: deep underwater resonance, muffled pressure."
-  },
-  {
-    "scene_number": 2,
-    "text": "I breathe, but air feels thin.",
-    "video_prompt": "Translucent lungs struggling to expand in foggy void. Gentle zoom in. Ambient sounds: labored breathing, soft wind."
-  }
-]
-
-Return as JSON array with format:
-[
-  {
-    "scene_number": 1,
-    "text": "...",
-    "video_prompt": "..."
-  },
-  ...
-]"""
-    else:
-        media_instructions = """
-For each scene, provide:
-1. The text to be spoken (use only simple punctuation - periods, commas, question marks, exclamation points. No em dashes or colons)
-   NOTE: For images, scenes can be longer and more contemplative (30-60 words is fine)
-2. An IMAGE generation prompt that captures the emotional tone (abstract, contemplative, emotionally resonant - not literal). CRITICAL: The image should contain NO TEXT OR WORDS. Every concept must be represented through imagery alone, not written language.
-   IMPORTANT: In the JSON, keep all prompts on a SINGLE LINE (no line breaks within strings)
-
-Example of valid JSON (COPY THIS FORMAT EXACTLY):
-[
-  {
-    "scene_number": 1,
-    "text": "The weight settles in my chest like stones in deep water. I breathe, but the air feels thin, insufficient.",
-    "image_prompt": "Abstract stones sinking through dark water, heavy descent through gradient blues, minimalist composition."
-  },
-  {
-    "scene_number": 2,
-    "text": "Each day I wake expecting her voice, the familiar cadence of morning routines we built together.",
-    "image_prompt": "Empty bed bathed in morning light, rumpled sheets suggesting recent presence, window casting long shadows."
-  }
-]
-
-Return as JSON array with format:
-[
-  {
-    "scene_number": 1,
-    "text": "...",
-    "image_prompt": "..."
-  },
-  ...
-]"""
-    
-    message = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=5000,  # Increased for 20-30+ scenes
-        messages=[{
-            "role": "user",
-            "content": f"""Break this narrative into scenes for {media_type.lower()} generation. Make sure that the entire narrative is accounted for. It is important that all text from the narrative land in a scene. 
-
-IMPORTANT SCENE COUNT GUIDANCE:
-{"- For VIDEO mode: Create 20-30+ scenes (each scene limited to 20-25 words to fit 10-second video limit)" if media_type == "Videos" else "- For IMAGE mode: Create as many scenes as the content needs (typically 8-16 scenes). Each scene can be longer and more contemplative."}
-{"- Break narrative into smaller emotional beats - each distinct moment should be its own scene" if media_type == "Videos" else "- Break narrative at major tonal shifts and emotional transitions - scenes can contain multiple related thoughts"}
-- Don't artificially compress multiple ideas into one scene, but also don't over-segment
-
-{media_instructions}{character_context}{art_direction_context}
-]
-
-Narrative:
-{narrative}
-
-CRITICAL JSON FORMATTING:
-- Return ONLY a valid JSON array, nothing else
-- NO markdown formatting, NO code blocks, NO backticks
-- CRITICAL: Do NOT use quotation marks (") or apostrophes (') anywhere inside the prompt text - these break JSON parsing
-- Instead of quotes, use descriptive phrases (e.g., write "so-called grief" as "apparent grief")
-- NO line breaks inside string values (use spaces instead)
-- Test: Your response should start with [ and end with ]
-
-Return only the JSON array, no markdown formatting."""
-        }]
-    )
-    
-    # Check if response was truncated
-    if message.stop_reason == "max_tokens":
-        import streamlit as st
-        st.error("⚠️ Response was truncated (too many scenes). Try shortening your narrative or the response may be incomplete.")
-    
-    # Parse JSON from response
-    response_text = message.content[0].text.strip()
-    
-    # Remove markdown code blocks if present
-    if response_text.startswith('```'):
-        response_text = response_text.split('```')[1]
-        if response_text.startswith('json'):
-            response_text = response_text[4:]
-        response_text = response_text.strip()
-    
-    # Try to parse JSON with better error handling
-    try:
-        return json.loads(response_text.strip())
-    except json.JSONDecodeError as e:
-        # Show detailed error for debugging
-        print(f"JSON Parse Error: {e}")
-        print(f"Response length: {len(response_text)} characters")
-        
-        # Try to show this in Streamlit if available
-        try:
-            import streamlit as st
-            st.error(f"JSON parsing failed at position {e.pos}")
-            st.error(f"Error: {str(e)}")
-            
-            # Show the problematic area
-            error_snippet = response_text[max(0, e.pos-200):min(len(response_text), e.pos+200)]
-            st.code(error_snippet, language="json")
-            
-            with st.expander("Show full raw response for debugging"):
-                st.code(response_text, language="json")
-            
-            st.warning("""**Workaround:** The AI generated invalid JSON (likely unescaped quotes in a prompt). 
-            
-Try one of these:
-1. Click "Break Into Scenes" again (it might work on retry)
-2. Simplify your art direction (remove any quotation marks)
-3. Shorten your narrative
-4. Try without art direction first""")
-        except:
-            pass
-        
-        raise
-
-def generate_video(prompt, scene_text, api_key, scene_num, output_folder, status_callback=None):
-    """Generate video using Veo with extensions to reach target duration"""
-    import time
-    from google.api_core import exceptions as google_exceptions
-    
-    client = genai.Client(api_key=api_key)
-    
-    def retry_on_rate_limit(api_call, max_retries=5, initial_delay=30):
-        """Retry an API call with exponential backoff on rate limit errors"""
-        delay = initial_delay
-        for attempt in range(max_retries):
-            try:
-                return api_call()
-            except Exception as e:
-                error_str = str(e)
-                # Check if it's a rate limit error (429 or RESOURCE_EXHAUSTED)
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower():
-                    if attempt < max_retries - 1:
-                        if status_callback:
-                            status_callback(f"Scene {scene_num}: Rate limit hit. Waiting {delay}s before retry {attempt + 1}/{max_retries}...")
-                        time.sleep(delay)
-                        delay *= 2  # Exponential backoff
-                        continue
-                    else:
-                        if status_callback:
-                            status_callback(f"Scene {scene_num}: Rate limit - max retries reached")
-                        raise
-                else:
-                    # Not a rate limit error, raise immediately
-                    raise
-        return None
-    
-    # Calculate target duration based on word count (2.5 words/second speaking rate)
-    word_count = len(scene_text.split())
-    target_seconds = word_count / 2.5
-    
-    # Clamp to reasonable bounds
-    target_seconds = max(8, min(target_seconds, 60))  # Between 8-60 seconds
-    
-    if status_callback:
-        status_callback(f"Scene {scene_num}: {word_count} words → targeting {target_seconds:.1f}s")
-    
-    # Add no-text instruction
-    enhanced_prompt = f"{prompt}. IMPORTANT: Do not include any text, words, letters, or numbers in the video."
-    
-    # Generate initial 8-second video
-    if status_callback:
-        status_callback(f"Scene {scene_num}: Generating initial 8s video...")
-    
-    def make_initial_video():
-        return client.models.generate_videos(
-            model="veo-3.1-fast-generate-preview",
-            prompt=enhanced_prompt,
-            config={"duration_seconds": 8}
-        )
-    
-    operation = retry_on_rate_limit(make_initial_video)
-    
-    # Poll until ready
-    while not operation.done:
-        time.sleep(10)
-        operation = client.operations.get(operation)
-    
-    current_duration = 8
-    current_video = operation.response.generated_videos[0].video
-    
-    # Calculate extensions needed
-    remaining_seconds = target_seconds - 8
-    extensions_needed = max(0, int(remaining_seconds / 7) + (1 if remaining_seconds % 7 > 0 else 0))
-    
-    if status_callback:
-        status_callback(f"Scene {scene_num}: Need {extensions_needed} extensions to reach {target_seconds:.1f}s")
-    
-    # Wait for video to be fully processed on Google's servers before extending
-    if extensions_needed > 0:
-        if status_callback:
-            status_callback(f"Scene {scene_num}: Waiting for video to be processed before extending...")
-        time.sleep(30)  # Give Google's servers time to process the video
-    
-    # Extend until we reach target duration
-    for ext_num in range(extensions_needed):
-        if status_callback:
-            status_callback(f"Scene {scene_num}: Extension {ext_num + 1}/{extensions_needed}...")
-        
-        # Extension prompt should describe continuation, not repeat original
-        extend_prompt = "Continue this video naturally, maintaining the same visual style and mood. Keep the camera movement and composition consistent with what came before. IMPORTANT: Do not include any text, words, letters, or numbers in the video."
-        
-        def make_extension():
-            return client.models.generate_videos(
-                model="veo-3.1-fast-generate-preview",
-                video=current_video,
-                prompt=extend_prompt,
-            )
-        
-        operation = retry_on_rate_limit(make_extension)
-        
-        # Poll until ready
-        while not operation.done:
-            time.sleep(10)
-            operation = client.operations.get(operation)
-        
-        current_video = operation.response.generated_videos[0].video
-        current_duration += 7
-    
-    # Download final video
-    if status_callback:
-        status_callback(f"Scene {scene_num}: Downloading final {current_duration}s video...")
-    
-    video_path = output_folder / f"scene_{scene_num:02d}.mp4"
-    client.files.download(file=current_video)
-    current_video.save(str(video_path))
-    
-    return video_path, current_duration
-
-def generate_image(prompt, api_key, scene_num, output_folder):
-    """Generate image using Gemini (nano banana)"""
-    import time
-    
-    client = genai.Client(api_key=api_key)
-    
-    def retry_on_rate_limit(api_call, max_retries=5, initial_delay=30):
-        """Retry an API call with exponential backoff on rate limit errors"""
-        delay = initial_delay
-        for attempt in range(max_retries):
-            try:
-                return api_call()
-            except Exception as e:
-                error_str = str(e)
-                # Check if it's a rate limit error (429 or RESOURCE_EXHAUSTED)
-                if '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower():
-                    if attempt < max_retries - 1:
-                        print(f"Scene {scene_num}: Rate limit hit. Waiting {delay}s before retry {attempt + 1}/{max_retries}...")
-                        time.sleep(delay)
-                        delay *= 2  # Exponential backoff
-                        continue
-                    else:
-                        print(f"Scene {scene_num}: Rate limit - max retries reached")
-                        raise
-                else:
-                    # Not a rate limit error, raise immediately
-                    raise
-        return None
-    
-    # Add explicit instruction to avoid text in images
-    enhanced_prompt = f"{prompt}. IMPORTANT: Do not include any text, words, letters, or numbers in the image."
-    
-    def make_image():
-        return client.models.generate_content(
-            model="gemini-2.5-flash-image",
-            contents=[enhanced_prompt],
-        )
-    
-    response = retry_on_rate_limit(make_image)
-    
-    # Extract and save image
-    image_path = output_folder / f"scene_{scene_num:02d}.png"
-    image_saved = False
-    
-    for part in response.parts:
-        if part.inline_data is not None:
-            image = part.as_image()
-            image.save(str(image_path))
-            image_saved = True
-            break
-    
-    if not image_saved:
-        raise Exception(f"No image data returned for scene {scene_num}")
-    
-    return image_path
-
-def generate_full_audio(narrative, api_key, output_folder):
-    """Generate complete audio for entire narrative"""
-    client = ElevenLabs(api_key=api_key)
-    
-    # Generate audio using text_to_speech.convert
-    audio = client.text_to_speech.convert(
-        text=narrative,
-        voice_id="2gPFXx8pN3Avh27Dw5Ma",  # Dean's voice
-        model_id="eleven_multilingual_v2",
-        output_format="mp3_44100_128",
-    )
-    
-    # Save full audio
-    full_audio_path = output_folder / "full_narrative.mp3"
-    with open(full_audio_path, 'wb') as f:
-        for chunk in audio:
-            f.write(chunk)
-    
-    return full_audio_path
-
-def get_word_timestamps(audio_path, openai_api_key):
-    """Use Whisper to get word-level timestamps"""
-    client = OpenAI(api_key=openai_api_key)
-    
-    with open(audio_path, 'rb') as audio_file:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="verbose_json",
-            timestamp_granularities=["word"]
-        )
-    
-    return transcript
-
-def find_scene_boundaries(scenes, transcript):
-    """Match scenes to transcript and find their start/end times"""
-    words = transcript.words
-    scene_start_times = []
-    
-    word_index = 0
-    
-    # First pass: find where each scene actually starts
-    for scene in scenes:
-        scene_text = scene['text'].lower().strip()
-        scene_words = scene_text.split()[:10]  # Use first 10 words for matching
-        
-        start_time = None
-        
-        # Search for the scene's starting words
-        for i in range(word_index, len(words)):
-            # Access word object attributes with dot notation
-            transcript_slice = ' '.join([words[j].word.lower().strip('.,!?') for j in range(i, min(i + min(5, len(scene_words)), len(words)))])
-            scene_slice = ' '.join(scene_words[:min(5, len(scene_words))])
-            
-            # Simple fuzzy match - check if most words match
-            if len(set(transcript_slice.split()) & set(scene_slice.split())) >= 3:
-                start_time = words[i].start
-                word_index = i + 1  # Move forward for next search
-                break
-        
-        scene_start_times.append({
-            'scene_number': scene['scene_number'],
-            'start': start_time
-        })
-    
-    # Second pass: set end times based on next scene's start
-    scene_boundaries = []
-    for i, scene_time in enumerate(scene_start_times):
-        end_time = None
-        
-        if scene_time['start'] is not None:
-            # If there's a next scene, use its start time as this scene's end
-            if i + 1 < len(scene_start_times) and scene_start_times[i + 1]['start'] is not None:
-                end_time = scene_start_times[i + 1]['start']
-            else:
-                # Last scene - use the last word's end time
-                end_time = words[-1].end
-        
-        scene_boundaries.append({
-            'scene_number': scene_time['scene_number'],
-            'start': scene_time['start'],
-            'end': end_time
-        })
-    
-    return scene_boundaries
-
-def check_ffmpeg():
-    """Check if FFmpeg is available"""
-    try:
-        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
-
-def split_audio_by_scenes(full_audio_path, scene_boundaries, output_folder):
-    """Split the full audio file into individual scene files using FFmpeg"""
-    
-    # Check if FFmpeg is available
-    if not check_ffmpeg():
-        raise Exception(
-            "FFmpeg not found. Please install FFmpeg:\n"
-            "Windows: winget install ffmpeg  OR  download from https://ffmpeg.org/\n"
-            "Mac: brew install ffmpeg\n"
-            "Linux: sudo apt install ffmpeg"
-        )
-    
-    for boundary in scene_boundaries:
-        if boundary['start'] is not None and boundary['end'] is not None:
-            scene_path = output_folder / f"scene_{boundary['scene_number']:02d}.mp3"
-            
-            # Calculate duration
-            duration = boundary['end'] - boundary['start']
-            
-            # Use FFmpeg to extract the segment
-            # -ss: start time, -t: duration, -acodec copy: copy audio without re-encoding
-            cmd = [
-                'ffmpeg',
-                '-i', str(full_audio_path),
-                '-ss', str(boundary['start']),
-                '-t', str(duration),
-                '-acodec', 'copy',
-                '-y',  # Overwrite output file if it exists
-                str(scene_path)
-            ]
-            
-            try:
-                subprocess.run(cmd, check=True, capture_output=True)
-            except subprocess.CalledProcessError as e:
-                raise Exception(f"FFmpeg failed for scene {boundary['scene_number']}: {e.stderr.decode()}")
-
+if 'run_metrics' not in st.session_state:
+    # Narrative and scene timings are collected here until a run's output folder takes them over
+    st.session_state.run_metrics = RunMetrics()
 
 # Generate narrative button
 col1, col2 = st.columns([3, 1])
 with col1:
     if st.button("Generate Narrative", type="primary", disabled=not (input_text and anthropic_key)):
-        with st.spinner("Crafting your narrative..."):
+        st.session_state.run_metrics = RunMetrics()  # New narrative, new run
+        with st.spinner("Crafting your narrative..."), activate(st.session_state.run_metrics):
             st.session_state.narrative = generate_narrative(input_text, anthropic_key)
             st.session_state.scenes = None  # Reset scenes when narrative changes
 
@@ -650,22 +168,63 @@ if st.session_state.narrative:
         st.session_state.narrative = edited_narrative
     with col2:
         if st.button("🔄 Regenerate Narrative"):
-            with st.spinner("Regenerating..."):
-                st.session_state.narrative = generate_narrative(input_text, anthropic_key)
+            st.session_state.run_metrics = RunMetrics()
+            with st.spinner("Regenerating..."), activate(st.session_state.run_metrics):
+                st.session_state.narrative = generate_narrative(input_text, anthropic_key, use_cache=False)
                 st.session_state.scenes = None
                 st.rerun()
     
     # Break into scenes button
     st.markdown("---")
-    if st.button("Break Into Scenes", type="primary"):
-        with st.spinner("Creating scene breakdown..."):
-            st.session_state.scenes = break_into_scenes(
-                st.session_state.narrative, 
-                anthropic_key,
-                character_info if character_info else None,
-                media_type,  # Pass the selected media type
-                art_direction if art_direction else None  # Pass art direction
-            )
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        break_clicked = st.button("Break Into Scenes", type="primary")
+    with col2:
+        # Bypasses the response cache so the same inputs get a fresh breakdown
+        regenerate_scenes_clicked = st.button("🔄 Regenerate Scenes", disabled=not st.session_state.scenes)
+    if break_clicked or regenerate_scenes_clicked:
+        # Scenes show up as they stream in, so a failure later on still leaves the ones received
+        st.session_state.scenes = []
+        live_scene_list = st.empty()
+        
+        def show_streamed_scene(scene):
+            st.session_state.scenes.append(scene)
+            live_scene_list.markdown("\n".join(
+                f"- **Scene {s['scene_number']}:** {s['text']}" for s in st.session_state.scenes
+            ))
+        
+        try:
+            with st.spinner("Creating scene breakdown..."), activate(st.session_state.run_metrics):
+                st.session_state.scenes = break_into_scenes(
+                    st.session_state.narrative, 
+                    anthropic_key,
+                    character_info if character_info else None,
+                    media_type,  # Pass the selected media type
+                    art_direction if art_direction else None,  # Pass art direction
+                    use_cache=not regenerate_scenes_clicked,
+                    on_scene=show_streamed_scene,
+                    status_callback=st.warning
+                )
+        except json.JSONDecodeError as e:
+            response_text = e.doc
+            st.error(f"JSON parsing failed at position {e.pos}")
+            st.error(f"Error: {str(e)}")
+            
+            # Show the problematic area
+            error_snippet = response_text[max(0, e.pos-200):min(len(response_text), e.pos+200)]
+            st.code(error_snippet, language="json")
+            
+            with st.expander("Show full raw response for debugging"):
+                st.code(response_text, language="json")
+            
+            st.warning("""**Workaround:** The AI generated invalid JSON (likely unescaped quotes in a prompt). 
+            
+Try one of these:
+1. Click "Break Into Scenes" again (it might work on retry)
+2. Simplify your art direction (remove any quotation marks)
+3. Shorten your narrative
+4. Try without art direction first""")
+        live_scene_list.empty()
 
 # Show scenes if generated
 if st.session_state.scenes:
@@ -717,7 +276,23 @@ if st.session_state.scenes:
             else:
                 st.info("No matches found")
     
-    for scene in st.session_state.scenes:
+    # Button callbacks run before the fragment re-executes, so the new state shows without a st.rerun()
+    def set_scene_editing(scene_number, editing):
+        st.session_state[f"edit_scene_{scene_number}"] = editing
+    
+    def save_scene_prompt(scene_number, prompt_key):
+        for s in st.session_state.scenes:
+            if s['scene_number'] == scene_number:
+                s[prompt_key] = st.session_state[f"prompt_edit_{scene_number}"]
+                break
+        st.session_state[f"edit_scene_{scene_number}"] = False
+        st.toast(f"✅ Scene {scene_number} prompt updated!")
+    
+    def render_scene_editor(scene_number):
+        """One scene's expander - runs as a fragment, so its buttons only rerun this scene"""
+        scene = next((s for s in st.session_state.scenes if s['scene_number'] == scene_number), None)
+        if scene is None:
+            return
         with st.expander(f"Scene {scene['scene_number']}", expanded=False):
             # Calculate word count
             word_count = len(scene['text'].split())
@@ -746,12 +321,11 @@ if st.session_state.scenes:
             # Show prompt or edit field based on state
             if not st.session_state[edit_key]:
                 st.markdown(f"**{prompt_label}:** {scene[prompt_key]}")
-                if st.button(f"✏️ Edit Prompt", key=f"edit_btn_{scene['scene_number']}"):
-                    st.session_state[edit_key] = True
-                    st.rerun()
+                st.button("✏️ Edit Prompt", key=f"edit_btn_{scene['scene_number']}",
+                          on_click=set_scene_editing, args=(scene['scene_number'], True))
             else:
                 # Edit mode
-                edited_prompt = st.text_area(
+                st.text_area(
                     f"{prompt_label}:",
                     value=scene[prompt_key],
                     height=100,
@@ -760,139 +334,298 @@ if st.session_state.scenes:
                 
                 col1, col2 = st.columns(2)
                 with col1:
-                    if st.button("💾 Save", key=f"save_{scene['scene_number']}", type="primary"):
-                        # Update the scene in session state
-                        for s in st.session_state.scenes:
-                            if s['scene_number'] == scene['scene_number']:
-                                s[prompt_key] = edited_prompt
-                                break
-                        st.session_state[edit_key] = False
-                        st.success(f"✅ Scene {scene['scene_number']} prompt updated!")
-                        st.rerun()
+                    # Update the scene in session state
+                    st.button("💾 Save", key=f"save_{scene['scene_number']}", type="primary",
+                              on_click=save_scene_prompt, args=(scene['scene_number'], prompt_key))
                 with col2:
-                    if st.button("❌ Cancel", key=f"cancel_{scene['scene_number']}"):
-                        st.session_state[edit_key] = False
-                        st.rerun()
+                    st.button("❌ Cancel", key=f"cancel_{scene['scene_number']}",
+                              on_click=set_scene_editing, args=(scene['scene_number'], False))
+    
+    # Only one page of scenes is built per run, so long projects stay as responsive as short ones
+    scene_count = len(st.session_state.scenes)
+    page_count = (scene_count + SCENES_PER_PAGE - 1) // SCENES_PER_PAGE
+    if st.session_state.get('scene_page', 0) >= page_count:
+        st.session_state.scene_page = 0
+    if page_count > 1:
+        st.selectbox(
+            "Scenes",
+            list(range(page_count)),
+            format_func=lambda page: f"Scenes {page * SCENES_PER_PAGE + 1}–{min(scene_count, (page + 1) * SCENES_PER_PAGE)}",
+            key="scene_page"
+        )
+    page = st.session_state.get('scene_page', 0)
+    for scene in st.session_state.scenes[page * SCENES_PER_PAGE:(page + 1) * SCENES_PER_PAGE]:
+        st.fragment(render_scene_editor)(scene['scene_number'])
     
     # Generate all assets button
     st.markdown("---")
     all_keys_present = anthropic_key and google_key and elevenlabs_key
+    force_reroll = st.checkbox(
+        "🎲 Force re-roll (ignore cached media)",
+        help="Scenes whose prompt hasn't changed are normally reused from the media cache. Tick this to pay for fresh generations."
+    )
     
-    if st.button("🎨 Generate All Assets", type="primary", disabled=not all_keys_present):
-        # Create output folder
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_folder = Path(f"/mnt/user-data/outputs/video_{timestamp}")
-        output_folder.mkdir(parents=True, exist_ok=True)
+    # Videos: narrate first, then size every clip from the measured audio and show the plan
+    # before any Veo call is made. Narration runs as a background job like asset generation.
+    plan_job = get_job_manager().get(st.session_state.get('plan_job_id'))
+    if plan_job is not None and not plan_job.active:
+        # The planning job finished since the last run - adopt its plan (errors show in the job panel)
+        st.session_state.plan_job_id = None
+        if plan_job.state == "done":
+            plan_folder, plan_narrative, finished_plan = plan_job.result
+            st.session_state.video_plan = finished_plan
+            st.session_state.video_plan_folder = plan_folder
+            st.session_state.video_plan_narrative = plan_narrative
+            st.session_state.output_folder = plan_folder
+        plan_job = None
+    
+    video_plan = st.session_state.get('video_plan')
+    plan_current = (
+        video_plan is not None
+        and st.session_state.get('video_plan_narrative') == st.session_state.narrative
+        and [entry['text_hash'] for entry in video_plan] == [text_hash(scene['text']) for scene in st.session_state.scenes]
+    )
+    if media_type == "Videos":
+        if st.button("🎙️ Generate Audio & Plan Videos", disabled=not all_keys_present or plan_job is not None):
+            # Re-planning the same narrative reuses its folder (and audio); a new narrative gets a new one
+            plan_folder = None
+            if st.session_state.get('video_plan_narrative') == st.session_state.narrative:
+                plan_folder = st.session_state.get('video_plan_folder')
+            plan_folder = plan_folder or create_output_folder()
+            
+            # Snapshot the inputs - the job keeps running while scenes are edited or the page reruns
+            plan_narrative = st.session_state.narrative
+            plan_scenes = copy.deepcopy(st.session_state.scenes)
+            plan_chunked_audio = chunked_audio
+            plan_use_cache = not force_reroll
+            plan_metrics = st.session_state.run_metrics
+            
+            def run_video_plan(job):
+                job.set_status("audio", "🎙️ Generating narration and measuring each scene...")
+                job.set_status("media", "Waiting for the video plan...")
+                with activate(plan_metrics):
+                    plan = prepare_video_plan(
+                        plan_narrative,
+                        plan_scenes,
+                        elevenlabs_key,
+                        plan_folder,
+                        chunked_audio=plan_chunked_audio,
+                        use_cache=plan_use_cache
+                    )
+                job.set_status("audio", "✅ Narration measured")
+                job.set_progress("audio", 1.0)
+                job.set_status("media", f"🎞️ {sum(entry['veo_calls'] for entry in plan)} Veo calls planned - review the plan below")
+                job.set_progress("media", 1.0)
+                return plan_folder, plan_narrative, plan
+            
+            plan_job = get_job_manager().submit(f"Plan videos → {plan_folder.name}", run_video_plan)
+            st.session_state.plan_job_id = plan_job.id
+        
+        if plan_job is not None:
+            st.info("🎙️ Generating narration and measuring each scene in the background - the plan appears here when the job finishes.")
+        
+        if video_plan:
+            st.markdown("#### 🎞️ Video Plan")
+            st.dataframe(
+                [{
+                    'Scene': entry['scene_number'],
+                    'Narration (s)': entry['audio_seconds'],
+                    'Word estimate (s)': entry['estimated_seconds'],
+                    'Clip (s)': entry['clip_seconds'],
+                    'Extensions': entry['extensions'],
+                    'Veo calls': entry['veo_calls'],
+                } for entry in video_plan],
+                hide_index=True,
+                use_container_width=True
+            )
+            planned_calls = sum(entry['veo_calls'] for entry in video_plan)
+            estimated_calls = sum(entry['word_estimate_calls'] for entry in video_plan)
+            unmeasured = sum(1 for entry in video_plan if entry['audio_seconds'] is None)
+            st.caption(
+                f"{planned_calls} Veo calls planned ({estimated_calls} with the word-count estimate)"
+                + (f" - {unmeasured} scene(s) not found in the audio use the estimate" if unmeasured else "")
+            )
+            if not plan_current:
+                st.warning("Scenes changed since this plan was made - plan again before generating.")
+            
+            # Pre-flight: what the run will submit and how long it should take, from past Veo latencies
+            estimate = estimate_video_run(
+                st.session_state.scenes,
+                plan_targets(video_plan, st.session_state.scenes),
+                concurrency=video_concurrency,
+                use_cache=not force_reroll,
+                output_folder=st.session_state.get('video_plan_folder')
+            )
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Veo calls", estimate['veo_calls'], help=f"{estimate['initial_calls']} initial + {estimate['extension_calls']} extensions")
+            with col2:
+                st.metric("Estimated time", format_duration(estimate['wall_seconds']))
+            with col3:
+                st.metric("If Veo runs slow", format_duration(estimate['slow_wall_seconds']))
+            st.caption(describe_estimate(estimate))
+    
+    needs_plan = media_type == "Videos" and not plan_current
+    generate_clicked = st.button("🎨 Generate All Assets", type="primary", disabled=not all_keys_present or needs_plan)
+    resume_folder = st.session_state.pop('pending_resume', None)
+    
+    if generate_clicked or resume_folder:
+        # Finish an interrupted run in its original folder, continue the planned one, or start a new one
+        if resume_folder:
+            output_folder = Path(resume_folder)
+        elif media_type == "Videos":
+            output_folder = st.session_state.video_plan_folder
+        else:
+            output_folder = create_output_folder()
         st.session_state.output_folder = output_folder
         
-        # Save narrative
-        with open(output_folder / "narrative.txt", 'w') as f:
-            f.write(st.session_state.narrative)
+        # Snapshot the inputs - the job keeps running while scenes are edited or the page reruns
+        run_narrative = st.session_state.narrative
+        run_scenes = copy.deepcopy(st.session_state.scenes)
+        run_character_info = character_info
+        run_media_type = media_type
+        run_use_cache = not force_reroll
+        run_image_concurrency = image_concurrency
+        run_video_concurrency = video_concurrency
+        run_chunked_audio = chunked_audio
+        run_video_plan = copy.deepcopy(video_plan) if plan_current and not resume_folder else None
+        # The job takes over this session's timings; anything generated afterwards starts a new record
+        run_metrics = st.session_state.run_metrics if not resume_folder else None
+        st.session_state.run_metrics = RunMetrics()
         
-        # Save character info if provided
-        if character_info and character_info.strip():
-            with open(output_folder / "character_info.txt", 'w') as f:
-                f.write(character_info.strip())
+        def run_generation(job):
+            return generate_assets(
+                run_narrative,
+                run_scenes,
+                run_media_type,
+                google_key,
+                elevenlabs_key,
+                output_folder,
+                character_info=run_character_info,
+                image_concurrency=run_image_concurrency,
+                video_concurrency=run_video_concurrency,
+                use_cache=run_use_cache,
+                reporter=job,
+                cancel_event=job.cancel_event,
+                chunked_audio=run_chunked_audio,
+                video_plan=run_video_plan,
+                metrics=run_metrics
+            )
         
-        # Save scene data
-        with open(output_folder / "scenes.json", 'w') as f:
-            json.dump(st.session_state.scenes, f, indent=2)
+        job = get_job_manager().submit(f"Generate assets → {output_folder.name}", run_generation)
+        st.toast(f"Started background job {job.id}")
+
+# Background generation jobs - they run outside the script, this panel just polls their state
+generation_jobs = get_job_manager().list_jobs()
+if generation_jobs:
+    st.markdown("---")
+    st.subheader("⚙️ Generation Jobs")
+    st.caption("Jobs keep running while you edit scenes, rerun the app or close the tab.")
+    
+    job_state_icons = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "cancelled": "⏹️"}
+    
+    def render_generation_jobs():
+        for job in get_job_manager().list_jobs()[:5]:
+            snapshot = job.snapshot()
+            with st.container(border=True):
+                st.markdown(f"{job_state_icons[snapshot['state']]} **{snapshot['name']}** · `{snapshot['id']}` · {snapshot['state']}")
+                
+                status = snapshot['status']
+                progress = snapshot['progress']
+                st.progress(progress.get('media', 0.0), text=f"Media: {status.get('media', 'Waiting...')}")
+                st.progress(progress.get('audio', 0.0), text=f"Audio: {status.get('audio', 'Waiting...')}")
+                
+                events = snapshot['events']
+                for _, level, message in events[-5:]:
+                    getattr(st, level)(message)
+                if len(events) > 5:
+                    with st.expander(f"Full log ({len(events)} events)"):
+                        st.text("\n".join(message for _, _, message in events))
+                
+                if job.active:
+                    if snapshot['cancel_requested']:
+                        st.caption("Cancelling - waiting for in-flight requests...")
+                    elif st.button("⏹️ Cancel", key=f"cancel_job_{snapshot['id']}"):
+                        job.cancel()
         
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # A job finished since the page last ran - rerun it all once, so the video plan, output
+        # folder, rough cut and metrics sections pick up the result and the polling stops
+        if any(not get_job_manager().get(job_id).active for job_id in active_job_ids):
+            st.rerun()
+    
+    # Only the fragment re-executes while jobs are running, not the whole script
+    active_job_ids = [job.id for job in generation_jobs if job.active]
+    st.fragment(render_generation_jobs, run_every=2 if active_job_ids else None)()
+
+# Resume an interrupted or partially failed run
+resumable_runs = find_runs(OUTPUTS_ROOT)
+if resumable_runs:
+    st.markdown("---")
+    with st.expander("⏯️ Resume a Previous Run", expanded=False):
+        st.markdown("Finish a run in its original folder. Scenes that completed with an unchanged prompt are skipped - only missing, failed or edited scenes are generated.")
+        st.caption("Uses the scenes currently loaded in the app if they belong to this run (same narrative), otherwise the folder's saved narrative and scenes.")
         
-        # Track failures
-        failed_images = []
+        def describe_run(folder):
+            done, total = RunManifest.load(folder).summary()
+            return f"{folder.name} ({done}/{total} scenes done)"
         
-        # Step 1: Generate all media (images or videos)
-        status_text.text(f"🎨 Generating {media_type.lower()}...")
-        for i, scene in enumerate(st.session_state.scenes):
-            scene_num = scene['scene_number']
-            
-            # Get the appropriate prompt key based on what's in the scene
-            prompt_key = 'video_prompt' if 'video_prompt' in scene else 'image_prompt'
-            prompt = scene[prompt_key]
-            
-            if media_type == "Videos":
-                status_text.text(f"🎥 Generating video {i+1}/{len(st.session_state.scenes)} (scene {scene_num})...")
-                try:
-                    def video_status(msg):
-                        status_text.caption(msg)
-                    
-                    video_path, final_duration = generate_video(
-                        prompt, 
-                        scene['text'],
-                        google_key, 
-                        scene_num, 
-                        output_folder,
-                        status_callback=video_status
-                    )
-                    st.success(f"✅ Scene {scene_num} complete: {final_duration}s video generated")
-                    progress_bar.progress((i + 1) / (len(st.session_state.scenes) + 1))
-                except Exception as e:
-                    st.error(f"❌ Error generating video for scene {scene_num}: {str(e)}")
-                    failed_images.append(scene_num)
-                    progress_bar.progress((i + 1) / (len(st.session_state.scenes) + 1))
-            else:  # Images
-                status_text.text(f"🎨 Generating image {i+1}/{len(st.session_state.scenes)} (scene {scene_num})...")
-                try:
-                    generate_image(prompt, google_key, scene_num, output_folder)
-                    progress_bar.progress((i + 1) / (len(st.session_state.scenes) + 1))
-                except Exception as e:
-                    st.error(f"❌ Error generating image for scene {scene_num}: {str(e)}")
-                    failed_images.append(scene_num)
-                    progress_bar.progress((i + 1) / (len(st.session_state.scenes) + 1))
+        resume_choice = st.selectbox("Output folder", resumable_runs, format_func=describe_run)
+        if st.button("⏯️ Resume Run", disabled=not (google_key and elevenlabs_key)):
+            with open(resume_choice / "narrative.txt", 'r') as f:
+                folder_narrative = f.read()
+            same_project = st.session_state.scenes and text_hash(st.session_state.narrative or "") == text_hash(folder_narrative)
+            if not same_project:
+                # Loaded scenes are from another project (or the session is gone) - restore this run's inputs
+                st.session_state.narrative = folder_narrative
+                with open(resume_choice / "scenes.json", 'r') as f:
+                    st.session_state.scenes = json.load(f)
+            st.session_state.pending_resume = str(resume_choice)
+            st.rerun()
+
+# Where the time went - spans and API counters saved with each run
+metric_runs = [folder for folder in resumable_runs if (folder / METRICS_FILE).exists()]
+if metric_runs:
+    with st.expander("📊 Run Metrics", expanded=False):
+        current_folder = st.session_state.output_folder
+        metrics_folder = st.selectbox(
+            "Run",
+            metric_runs,
+            index=metric_runs.index(current_folder) if current_folder in metric_runs else 0,
+            format_func=lambda folder: folder.name,
+            key="metrics_folder"
+        )
+        metrics_data = load_run_metrics(metrics_folder)
+        counters = metrics_data['counters']
         
-        # Step 2: Generate full narrative audio
-        status_text.text("🎙️ Generating complete audio narrative...")
-        try:
-            full_audio_path = generate_full_audio(st.session_state.narrative, elevenlabs_key, output_folder)
-            progress_bar.progress(1.0)
-            st.success("✅ Audio generated successfully!")
-            audio_success = True
-        except Exception as e:
-            st.error(f"❌ Error generating audio: {str(e)}")
-            audio_success = False
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Busy time", f"{total_wall_seconds(metrics_data):.1f}s")
+        with col2:
+            st.metric("API calls", sum(c['calls'] for c in counters.values()))
+        with col3:
+            st.metric("429s", sum(c['rate_limited'] for c in counters.values()))
         
-        status_text.text("✅ Generation complete!")
+        st.markdown("**Stages**")
+        st.dataframe(summarize(metrics_data), hide_index=True, use_container_width=True)
+        st.caption("wall_s: time with at least one running. total_s: summed across parallel work.")
         
-        # Retry failed media
-        if failed_images:
-            st.warning(f"Retrying {len(failed_images)} failed {media_type.lower()}...")
-            status_text.text(f"🔄 Retrying failed {media_type.lower()}...")
-            
-            retry_failures = []
-            for scene_num in failed_images:
-                scene = next(s for s in st.session_state.scenes if s['scene_number'] == scene_num)
-                # Get the appropriate prompt key
-                prompt_key = 'video_prompt' if 'video_prompt' in scene else 'image_prompt'
-                prompt = scene[prompt_key]
-                
-                status_text.text(f"🔄 Retrying {media_type.lower()[:-1]} for scene {scene_num}...")
-                try:
-                    if media_type == "Videos":
-                        generate_video(prompt, scene['text'], google_key, scene_num, output_folder)
-                    else:
-                        generate_image(prompt, google_key, scene_num, output_folder)
-                    st.success(f"✅ Successfully generated {media_type.lower()[:-1]} for scene {scene_num} on retry")
-                except Exception as e:
-                    st.error(f"❌ Scene {scene_num} failed again: {str(e)}")
-                    retry_failures.append(scene_num)
-            
-            # Update failed list to only include ones that failed twice
-            failed_images = retry_failures
+        if counters:
+            st.markdown("**API calls by provider**")
+            st.dataframe(
+                [{'provider': provider, **values, 'MB': round(values['bytes'] / 1e6, 2)} for provider, values in counters.items()],
+                hide_index=True,
+                use_container_width=True,
+                column_order=['provider', 'calls', 'retries', 'rate_limited', 'queue_wait_s', 'MB']
+            )
         
-        # Summary
-        if not failed_images and audio_success:
-            st.success(f"All files saved to: {output_folder}")
-            st.balloons()
-        else:
-            st.warning(f"Generation completed with some errors. Files saved to: {output_folder}")
-            if failed_images:
-                st.error(f"Failed {media_type.lower()} (after retry) for scenes: {', '.join(map(str, failed_images))}")
-            if not audio_success:
-                st.error("Audio generation failed - check errors above")
+        scene_spans = sorted((s for s in metrics_data['spans'] if s['scene'] is not None), key=lambda s: s['seconds'], reverse=True)
+        if scene_spans:
+            st.markdown("**Slowest scene steps**")
+            st.dataframe(
+                [{'scene': s['scene'], 'step': s['name'], 'seconds': s['seconds'], **s['attrs']} for s in scene_spans[:10]],
+                hide_index=True,
+                use_container_width=True
+            )
 
 # Show output folder if exists
 if st.session_state.output_folder:
@@ -901,6 +634,22 @@ if st.session_state.output_folder:
     st.code(str(st.session_state.output_folder))
     st.info("Drag this folder into CapCut to start editing!")
     
+    # Timed rough cut of the folder's media over the narration, for review before editing
+    rough_cut_path = st.session_state.output_folder / ROUGH_CUT_FILE
+    if check_ffmpeg():
+        if st.button("🎞️ Render Rough Cut", help="Re-encodes only scenes whose media or timing changed since the last cut"):
+            with st.spinner("Rendering rough cut..."):
+                try:
+                    cut = render_rough_cut(st.session_state.output_folder)
+                    st.success(f"✅ Rendered {cut['seconds']:.0f}s rough cut ({cut['encoded']} scene(s) encoded, {cut['reused']} reused)")
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
+    else:
+        st.caption("Install FFmpeg to get a rough cut of each run.")
+    if rough_cut_path.exists():
+        with st.expander("🎞️ Rough Cut", expanded=False):
+            st.video(str(rough_cut_path))
+    
     # Media regeneration section
     st.markdown("---")
     st.subheader("🔄 Regenerate Individual Media")
@@ -933,7 +682,9 @@ if st.session_state.output_folder:
                 current_image_path = st.session_state.output_folder / f"scene_{scene_to_regen:02d}.png"
                 if current_image_path.exists():
                     with st.expander("🖼️ Current image", expanded=False):
-                        st.image(str(current_image_path), use_container_width=True)
+                        # Small cached preview instead of the full-resolution PNG
+                        preview_path = get_thumbnail(current_image_path) or current_image_path
+                        st.image(str(preview_path), use_container_width=True)
     
     with col2:
         custom_prompt = st.text_area(
@@ -943,6 +694,13 @@ if st.session_state.output_folder:
             help="The instruction to avoid text/words will be added automatically"
         )
     
+    regen_reroll = st.checkbox(
+        "🎲 Force re-roll",
+        value=True,
+        key="regen_reroll",
+        help="Untick to reuse a cached result if this exact prompt was generated before."
+    )
+    
     if st.button("🎨 Regenerate This Media", type="secondary"):
         if not custom_prompt.strip():
             st.error("Please enter a custom prompt")
@@ -953,20 +711,53 @@ if st.session_state.output_folder:
             current_file_path = st.session_state.output_folder / f"scene_{scene_to_regen:02d}.mp4"
             is_video = current_file_path.exists()
             media_label = "video" if is_video else "image"
+            scene = next((s for s in st.session_state.scenes if s['scene_number'] == scene_to_regen), None)
             
-            with st.spinner(f"Regenerating {media_label} for scene {scene_to_regen}..."):
-                try:
+            if is_video and not scene:
+                st.error("Could not find scene data")
+            else:
+                # Snapshot the inputs - a Veo regeneration takes minutes and must survive reruns
+                regen_prompt = custom_prompt
+                regen_scene_num = scene_to_regen
+                regen_folder = st.session_state.output_folder
+                regen_use_cache = not regen_reroll
+                regen_scene = copy.deepcopy(scene)
+                
+                def run_regeneration(job):
+                    job.set_status("media", f"Regenerating {media_label} for scene {regen_scene_num}...")
                     if is_video:
-                        scene = next((s for s in st.session_state.scenes if s['scene_number'] == scene_to_regen), None)
-                        if scene:
-                            generate_video(custom_prompt, scene['text'], google_key, scene_to_regen, st.session_state.output_folder)
-                        else:
-                            st.error("Could not find scene data")
+                        # Keep the clip length from the folder's video plan when the scene text is unchanged
+                        target_seconds = plan_targets(load_video_plan(regen_folder), [regen_scene]).get(regen_scene_num)
+                        generate_video(regen_prompt, regen_scene['text'], google_key, regen_scene_num, regen_folder,
+                                       status_callback=lambda msg: job.set_status("media", msg),
+                                       use_cache=regen_use_cache, target_seconds=target_seconds)
                     else:
-                        generate_image(custom_prompt, google_key, scene_to_regen, st.session_state.output_folder)
-                    st.success(f"✅ Successfully regenerated scene {scene_to_regen} {media_label}!")
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
+                        generate_image(regen_prompt, google_key, regen_scene_num, regen_folder, use_cache=regen_use_cache)
+                    job.set_status("media", f"✅ Successfully regenerated scene {regen_scene_num} {media_label}!")
+                    job.set_progress("media", 1.0)
+                    job.set_progress("audio", 1.0)  # Nothing to narrate
+                    job.set_status("audio", "Not needed")
+                
+                job = get_job_manager().submit(f"Regenerate scene {regen_scene_num} {media_label} → {regen_folder.name}", run_regeneration)
+                st.toast(f"Started background job {job.id}")
+
+# API throughput - shared limiter state, useful for tuning concurrency against quota
+limiter_stats = all_limiter_stats()
+if limiter_stats:
+    with st.sidebar.expander("📈 API Throughput", expanded=False):
+        st.dataframe(limiter_stats, hide_index=True, use_container_width=True)
+        st.caption("Rates adapt automatically on 429s. Set RATE_LIMIT_<PROVIDER>_RPM in .env to change the ceiling.")
+
+# Veo latency history - drives how often each operation is polled
+veo_latency_stats = get_latency_tracker().stats()
+if veo_latency_stats:
+    with st.sidebar.expander("⏱️ Veo Latency", expanded=False):
+        st.dataframe(
+            [{'kind': kind, **values} for kind, values in veo_latency_stats.items()],
+            hide_index=True,
+            use_container_width=True
+        )
+        st.caption("Seconds per operation. Polls are timed from these; every sample is also logged to VEO_LATENCY_LOG.")
 
 # Instructions
 with st.sidebar:
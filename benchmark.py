@@ -0,0 +1,227 @@
+"""End-to-end throughput benchmark on the offline fake providers (no API keys, no cost).
+
+Example:
+    python benchmark.py --media-type Videos --words 1500 --runs 3 --rate-limit-rate 0.05
+
+Each run goes narrative -> scenes -> (video plan) -> media + audio -> per-scene audio split
+-> rough cut (Images only, the fake clips aren't real video) against fake_providers and
+reports wall time per stage, API calls, 429s, retries and peak memory. Provider latencies and the app's own waits (rate limits, backoff, Veo polling) are
+all multiplied by --time-scale, so a run keeps the shape of a real one in a fraction of
+the time. Caches and outputs live in a temporary folder, fresh for every run unless
+--warm-cache is given.
+"""
+import argparse
+import json
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import clients
+import fake_providers
+import media_cache
+import pipeline
+import rate_limit
+import response_cache
+import run_metrics
+import thumbnails
+import veo_latency
+import veo_scheduler
+import video_download
+
+FAKE_KEY = "fake-key"
+
+_VOCABULARY = (
+    "grief light morning silence weight memory water stone breath window shadow voice hand "
+    "river winter absence warmth room door echo name season garden ash thread quiet return "
+    "carry hold remember forget wake drift settle break open close fall rise linger fade"
+).split()
+
+
+class QuietReporter(pipeline.RunReporter):
+    """Collects pipeline messages instead of printing them (unless verbose)"""
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.messages = []
+
+    def log(self, level, message):
+        self.messages.append(message)
+        if self.verbose:
+            print(f"  {message}")
+
+    def set_status(self, track, message):
+        self.log("info", message)
+
+
+def synthetic_text(words, seed):
+    """Stream-of-consciousness stand-in: paragraphs of 3-6 sentences of 6-18 words"""
+    rng = random.Random(seed)
+    paragraphs = []
+    count = 0
+    while count < words:
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            length = min(rng.randint(6, 18), max(1, words - count))
+            count += length
+            sentence = " ".join(rng.choice(_VOCABULARY) for _ in range(length))
+            sentences.append(sentence.capitalize() + rng.choice(".?!."))
+            if count >= words:
+                break
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def scale_time(time_scale):
+    """Shrink the app's own waits in step with the fakes' latencies"""
+    fake_providers.configure(time_scale=time_scale)
+    for settings in rate_limit.PROVIDER_DEFAULTS.values():
+        settings["rpm"] = settings["rpm"] / time_scale
+        settings["initial_backoff"] = 30 * time_scale
+    veo_latency.MIN_POLL_INTERVAL *= time_scale
+    veo_scheduler.MIN_POLL_INTERVAL = veo_latency.MIN_POLL_INTERVAL
+    veo_scheduler.MIN_SLEEP *= time_scale
+    veo_scheduler.EXTENSION_READY_TIMEOUT *= time_scale
+    video_download.RETRY_BACKOFF *= time_scale
+
+
+def isolate(workdir):
+    """Point every cache, log and output folder into workdir"""
+    media_cache.CACHE_DIR = workdir / "cache" / "media"
+    response_cache.CACHE_DIR = workdir / "cache" / "responses"
+    thumbnails.THUMBNAIL_DIR = workdir / "cache" / "thumbnails"
+    veo_latency._tracker = veo_latency.LatencyTracker(workdir / "cache" / "veo_latency.jsonl")
+    pipeline.OUTPUTS_ROOT = workdir / "outputs"
+
+
+def run_once(args, raw_text):
+    """One full pipeline run; returns its measurements"""
+    fake_providers.reset_stats()
+    rate_limit.reset_limiters()
+    reporter = QuietReporter(args.verbose)
+    stages = {}
+
+    def timed(name, fn, *fn_args, **fn_kwargs):
+        start = time.perf_counter()
+        result = fn(*fn_args, **fn_kwargs)
+        stages[name] = round(time.perf_counter() - start, 3)
+        return result
+
+    tracemalloc.start()
+    run_start = time.perf_counter()
+    metrics = run_metrics.RunMetrics()
+
+    with run_metrics.activate(metrics):
+        narrative = timed("narrative", pipeline.generate_narrative, raw_text, FAKE_KEY)
+        scenes = timed("scenes", pipeline.break_into_scenes, narrative, FAKE_KEY, None, args.media_type)
+        output_folder = pipeline.create_output_folder()
+
+        video_plan = None
+        if args.media_type == "Videos":
+            video_plan = timed("video_plan", pipeline.prepare_video_plan, narrative, scenes, FAKE_KEY, output_folder)
+
+        result = timed(
+            "assets", pipeline.generate_assets,
+            narrative, scenes, args.media_type, FAKE_KEY, FAKE_KEY, output_folder,
+            image_concurrency=args.image_concurrency,
+            video_concurrency=args.video_concurrency,
+            reporter=reporter,
+            video_plan=video_plan,
+            render_cut=False  # Timed as its own stage below
+        )
+
+        if result['scene_timings'] and pipeline.check_ffmpeg():
+            timed("split", pipeline.split_audio_by_scenes, output_folder / "full_narrative.mp3", result['scene_timings'], output_folder)
+            if args.media_type == "Images":  # The fake clips aren't decodable video
+                timed("rough_cut", pipeline.render_rough_cut, output_folder, scenes, result['scene_timings'])
+        else:
+            stages["split"] = None  # No FFmpeg (or no timings) - skipped
+
+    wall = round(time.perf_counter() - run_start, 3)
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    limiter_stats = {stats["provider"]: stats for stats in rate_limit.all_limiter_stats()}
+    fake_stats = fake_providers.call_stats()
+    return {
+        "wall_s": wall,
+        "stages_s": stages,
+        "scenes": len(scenes),
+        "failed_scenes": result['failed'],
+        "audio_success": result['audio_success'],
+        "calls": {name: values['calls'] for name, values in fake_stats.items()},
+        "rate_limited": sum(values['rate_limited'] for values in fake_stats.values()),
+        "retries": sum(stats["retries"] for stats in limiter_stats.values()),
+        "payload_mb": round(sum(values['bytes'] for values in fake_stats.values()) / 1e6, 1),
+        "peak_traced_mb": round(peak_traced / 1e6, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # Process lifetime, Linux KB
+        "slowest_spans": run_metrics.summarize(metrics.to_dict())[:5],
+    }
+
+
+def print_run(index, run):
+    stages = ", ".join(f"{name} {'skipped' if seconds is None else f'{seconds:.2f}s'}" for name, seconds in run["stages_s"].items())
+    print(f"Run {index}: {run['wall_s']:.2f}s wall ({stages})")
+    print(f"  {run['scenes']} scenes, failed {run['failed_scenes'] or 'none'}, audio {'ok' if run['audio_success'] else 'failed'}")
+    print(f"  {sum(run['calls'].values())} API calls, {run['rate_limited']} x 429, {run['retries']} retries, {run['payload_mb']} MB payload")
+    print(f"  Peak memory: {run['peak_traced_mb']} MB traced, {run['peak_rss_mb']} MB RSS")
+    for name, count in sorted(run["calls"].items()):
+        print(f"    {name}: {count}")
+    print("  Where the time went (wall / summed seconds):")
+    for row in run["slowest_spans"]:
+        print(f"    {row['stage']}: {row['wall_s']:.2f}s / {row['total_s']:.2f}s over {row['count']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the full pipeline against offline fake providers.")
+    parser.add_argument("--media-type", choices=["Images", "Videos"], default="Images")
+    parser.add_argument("--words", type=int, default=800, help="Length of the synthetic input text")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Multiplier for every simulated and app-side wait")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability that any fake call returns a 429")
+    parser.add_argument("--download-failure-rate", type=float, default=0.0, help="Probability that a clip download drops partway through")
+    parser.add_argument("--image-concurrency", type=int, default=4)
+    parser.add_argument("--video-concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--warm-cache", action="store_true", help="Keep caches between runs instead of starting cold")
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    parser.add_argument("--verbose", action="store_true", help="Print pipeline progress")
+    args = parser.parse_args(argv)
+
+    clients.PROVIDER_BACKEND = "fake"
+    scale_time(args.time_scale)
+    fake_providers.configure(rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+                             veo={"download_failure_rate": args.download_failure_rate})
+    raw_text = synthetic_text(args.words, args.seed)
+
+    print(f"Benchmark: {args.media_type}, {args.words} words, time scale {args.time_scale}, 429 rate {args.rate_limit_rate}")
+    runs = []
+    workdir = Path(tempfile.mkdtemp(prefix="benchmark_"))
+    try:
+        for index in range(1, args.runs + 1):
+            if index == 1 or not args.warm_cache:
+                shutil.rmtree(workdir, ignore_errors=True)
+                isolate(workdir)
+            run = run_once(args, raw_text)
+            runs.append(run)
+            print_run(index, run)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if len(runs) > 1:
+        walls = [run["wall_s"] for run in runs]
+        print(f"Wall time: median {statistics.median(walls):.2f}s, min {min(walls):.2f}s, max {max(walls):.2f}s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"args": {k: str(v) for k, v in vars(args).items()}, "runs": runs}, f, indent=2)
+    return 0 if all(not run["failed_scenes"] and run["audio_success"] for run in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
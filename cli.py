@@ -0,0 +1,169 @@
+"""Headless batch runner: turn a folder of stream-of-consciousness files into output folders.
+
+Example:
+    python cli.py inputs/ --characters characters.txt --art-direction style.txt --media-type Images --max-projects 3
+
+Each input file goes through the same narrative -> scenes -> media + audio pipeline as the
+Streamlit app and gets its own output folder. Projects run concurrently up to --max-projects;
+API calls from all projects share the per-provider rate limiters.
+"""
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Before the project modules, which read their settings at import time
+load_dotenv()
+
+import pipeline
+import run_metrics
+from pipeline import RunReporter, generate_narrative, break_into_scenes, create_output_folder, generate_assets, prepare_video_plan, plan_targets
+from run_estimate import estimate_video_run, describe_estimate
+
+_print_lock = threading.Lock()
+
+
+class ProjectReporter(RunReporter):
+    """Prints pipeline progress prefixed with the project name"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def _print(self, message):
+        with _print_lock:
+            print(f"[{self.name}] {message}", flush=True)
+
+    def log(self, level, message):
+        self._print(message)
+
+    def set_status(self, track, message):
+        self._print(message)
+
+
+def read_optional(path):
+    if not path:
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def run_project(input_path, args, keys, character_info, art_direction):
+    """Run one input file end to end; returns generate_assets' summary"""
+    # Narrative and scene timings are held here until the output folder exists
+    with run_metrics.activate(run_metrics.RunMetrics()):
+        return _run_project(input_path, args, keys, character_info, art_direction)
+
+
+def _run_project(input_path, args, keys, character_info, art_direction):
+    reporter = ProjectReporter(input_path.stem)
+    with open(input_path, 'r', encoding='utf-8') as f:
+        raw_text = f.read()
+
+    reporter.log("info", "📝 Generating narrative...")
+    narrative = generate_narrative(raw_text, keys["anthropic"])
+
+    reporter.log("info", "🎬 Breaking into scenes...")
+    scenes = break_into_scenes(narrative, keys["anthropic"], character_info, args.media_type, art_direction)
+    reporter.log("info", f"{len(scenes)} scenes")
+
+    output_folder = create_output_folder(suffix=input_path.stem)
+    video_plan = None
+    if args.media_type == "Videos":
+        # Narrate first so every clip is sized from the measured audio
+        reporter.log("info", "🎙️ Generating audio and planning videos...")
+        video_plan = prepare_video_plan(narrative, scenes, keys["elevenlabs"], output_folder,
+                                        chunked_audio=not args.single_request_audio, use_cache=not args.force_reroll)
+        for entry in video_plan:
+            narration = f"{entry['audio_seconds']:.1f}s narration" if entry['audio_seconds'] is not None else "not in audio, estimated"
+            reporter.log("info", f"  Scene {entry['scene_number']}: {narration} → {entry['clip_seconds']}s clip, {entry['veo_calls']} Veo call(s)")
+        reporter.log("info", f"{sum(e['veo_calls'] for e in video_plan)} Veo calls planned "
+                             f"({sum(e['word_estimate_calls'] for e in video_plan)} with the word-count estimate)")
+        estimate = estimate_video_run(scenes, plan_targets(video_plan, scenes), args.video_concurrency,
+                                      use_cache=not args.force_reroll, output_folder=output_folder)
+        reporter.log("info", f"⏱️ {describe_estimate(estimate)}")
+
+    return generate_assets(
+        narrative,
+        scenes,
+        args.media_type,
+        keys["google"],
+        keys["elevenlabs"],
+        output_folder,
+        character_info=character_info,
+        image_concurrency=args.image_concurrency,
+        video_concurrency=args.video_concurrency,
+        use_cache=not args.force_reroll,
+        reporter=reporter,
+        chunked_audio=not args.single_request_audio,
+        video_plan=video_plan,
+        render_cut=not args.no_rough_cut
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-generate video assets from a folder of input text files.")
+    parser.add_argument("input_dir", type=Path, help="Folder of stream-of-consciousness files (*.txt)")
+    parser.add_argument("--characters", type=Path, default=Path("characters.txt") if Path("characters.txt").exists() else None,
+                        help="Character descriptions file (default: ./characters.txt if present)")
+    parser.add_argument("--art-direction", type=Path, help="Style guide / art direction file")
+    parser.add_argument("--media-type", choices=["Images", "Videos"], default="Images")
+    parser.add_argument("--max-projects", type=int, default=2, help="Projects processed at the same time")
+    parser.add_argument("--image-concurrency", type=int, default=int(os.getenv("IMAGE_CONCURRENCY", "4")))
+    parser.add_argument("--video-concurrency", type=int, default=int(os.getenv("VIDEO_CONCURRENCY", "4")))
+    parser.add_argument("--output-root", type=Path, help=f"Where output folders go (default: {pipeline.OUTPUTS_ROOT})")
+    parser.add_argument("--force-reroll", action="store_true", help="Ignore the media cache")
+    parser.add_argument("--single-request-audio", action="store_true",
+                        help="Synthesize the narration in one request instead of parallel chunks")
+    parser.add_argument("--no-rough-cut", action="store_true", help="Don't render rough_cut.mp4 at the end of each project")
+    args = parser.parse_args(argv)
+
+    keys = {
+        "anthropic": os.getenv("ANTHROPIC_API_KEY", ""),
+        "google": os.getenv("GOOGLE_API_KEY", ""),
+        "elevenlabs": os.getenv("ELEVENLABS_API_KEY", ""),
+    }
+    missing = [name for name, value in keys.items() if not value]
+    if missing:
+        parser.error(f"Missing API keys in environment/.env: {', '.join(missing)}")
+
+    input_files = sorted(path for path in args.input_dir.glob("*.txt") if path.is_file())
+    if not input_files:
+        parser.error(f"No .txt files found in {args.input_dir}")
+
+    if args.output_root:
+        pipeline.OUTPUTS_ROOT = args.output_root
+
+    character_info = read_optional(args.characters)
+    art_direction = read_optional(args.art_direction)
+
+    print(f"Processing {len(input_files)} project(s), {args.max_projects} at a time ({args.media_type})")
+    failures = {}
+    with ThreadPoolExecutor(max_workers=args.max_projects) as executor:
+        futures = {
+            executor.submit(run_project, path, args, keys, character_info, art_direction): path
+            for path in input_files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures[path.name] = str(e)
+                print(f"❌ {path.name}: {str(e)}")
+                continue
+            if result['failed'] or not result['audio_success']:
+                failures[path.name] = f"failed scenes {result['failed']}, audio {'ok' if result['audio_success'] else 'failed'}"
+            print(f"{'⚠️' if path.name in failures else '✅'} {path.name} -> {result['output_folder']}")
+
+    print(f"Done: {len(input_files) - len(failures)}/{len(input_files)} project(s) completed cleanly")
+    for name, reason in failures.items():
+        print(f"  {name}: {reason}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
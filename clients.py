@@ -0,0 +1,61 @@
+"""Long-lived API clients shared across calls, worker threads and Streamlit reruns.
+
+Every SDK client here wraps an httpx connection pool, so reusing one instance per
+(provider, API key) avoids a fresh TLS handshake for every scene and retry. The SDK
+clients are safe to share between threads; this module only has to make creation atomic.
+
+With PROVIDER_BACKEND=fake every provider is served by the offline stand-ins in
+fake_providers instead, so the SDKs are only imported when a real client is created.
+"""
+import os
+import threading
+
+PROVIDER_BACKEND = os.getenv("PROVIDER_BACKEND", "real")  # "real" or "fake"
+
+
+def _anthropic(api_key):
+    import anthropic
+    return anthropic.Anthropic(api_key=api_key)
+
+
+def _google(api_key):
+    from google import genai
+    return genai.Client(api_key=api_key)
+
+
+def _google_files(api_key):
+    # Plain HTTP for streaming finished Veo clips: the SDK's files.download buffers the
+    # whole video in memory, this lets video_download resume and write in chunks
+    from video_download import FilesClient
+    return FilesClient(api_key)
+
+
+def _elevenlabs(api_key):
+    from elevenlabs import ElevenLabs
+    return ElevenLabs(api_key=api_key)
+
+
+_FACTORIES = {
+    "anthropic": _anthropic,
+    "google": _google,
+    "google_files": _google_files,
+    "elevenlabs": _elevenlabs,
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider, api_key):
+    """Return the shared client for provider + api_key, creating it on first use"""
+    key = (provider, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if PROVIDER_BACKEND == "fake":
+                import fake_providers
+                client = fake_providers.make_client(provider)
+            else:
+                client = _FACTORIES[provider](api_key)
+            _clients[key] = client
+        return client
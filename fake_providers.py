@@ -0,0 +1,503 @@
+"""Offline stand-ins for the Anthropic, Google (Gemini/Veo) and ElevenLabs clients.
+
+Each fake implements just the SDK surface the pipeline uses and simulates it locally:
+latencies drawn from log-normal distributions, Veo's long-running operation lifecycle
+(submit -> poll -> processing -> ready to extend), injected 429s and realistically sized
+payloads (noise PNGs, silent MP3 frames, video blobs). Clip downloads go through a requests
+session whose transport serves the fake files (with Range support and injectable dropped
+connections). Nothing goes over the network.
+
+Use them by setting PROVIDER_BACKEND=fake (see clients.py), or call configure() first to
+shorten every delay (time_scale) or change failure rates - benchmark.py does both.
+"""
+import base64
+import io
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from types import SimpleNamespace
+
+import requests
+
+# Latencies are (median seconds, log-normal sigma); every sleep is multiplied by time_scale
+PROFILE = {
+    "time_scale": 1.0,
+    "anthropic": {
+        "latency": (15.0, 0.3),  # Whole non-streamed response
+        "first_token": (1.5, 0.3),
+        "chars_per_second": 300,  # Streaming output speed
+        "rate_limit_rate": 0.0,
+    },
+    "gemini_image": {
+        "latency": (8.0, 0.4),
+        "image_bytes": 1_500_000,
+        "mime_type": "image/png",  # "image/jpeg" exercises the conversion path
+        "rate_limit_rate": 0.0,
+    },
+    "veo": {
+        "submit": (1.0, 0.3),
+        "initial": (60.0, 0.35),  # Submit -> operation done
+        "extension": (50.0, 0.35),
+        "ready": (8.0, 0.5),  # Operation done -> clip can be extended
+        "poll": (0.3, 0.3),
+        "video_bytes_per_second": 400_000,
+        "download_bytes_per_second": 20_000_000,
+        "download_failure_rate": 0.0,  # Chance that a clip download drops partway through
+        "rate_limit_rate": 0.0,
+    },
+    "elevenlabs": {
+        "latency": (1.5, 0.3),  # Fixed cost per request
+        "synthesis_chars_per_second": 400,
+        "speech_chars_per_second": 15,  # Speaking rate of the generated audio
+        "rate_limit_rate": 0.0,
+    },
+}
+
+_rng = random.Random()
+_stats = {}  # "provider.method" -> {'calls', 'rate_limited', 'bytes'}
+_lock = threading.Lock()
+_videos = {}  # File id -> _FakeVideo, shared by every fake Google client and the download session
+
+
+def configure(time_scale=None, rate_limit_rate=None, seed=None, **providers):
+    """Adjust PROFILE: a global time_scale, one 429 rate for every provider, and per-provider overrides"""
+    if time_scale is not None:
+        PROFILE["time_scale"] = time_scale
+    if rate_limit_rate is not None:
+        for name, settings in PROFILE.items():
+            if isinstance(settings, dict):
+                settings["rate_limit_rate"] = rate_limit_rate
+    for name, overrides in providers.items():
+        PROFILE[name].update(overrides)
+    if seed is not None:
+        _rng.seed(seed)
+
+
+def call_stats():
+    """Copy of the per-method call counters"""
+    with _lock:
+        return {name: dict(values) for name, values in _stats.items()}
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+class FakeRateLimitError(Exception):
+    """Looks like a provider 429 to rate_limit.is_rate_limit_error"""
+    status_code = 429
+
+
+def _sample(latency):
+    median, sigma = latency
+    return median * math.exp(sigma * _rng.gauss(0, 1))
+
+
+def _sleep(seconds):
+    time.sleep(max(0.0, seconds) * PROFILE["time_scale"])
+
+
+def _scaled(seconds):
+    return seconds * PROFILE["time_scale"]
+
+
+def _record(name, rate_limited=False, payload=0):
+    with _lock:
+        entry = _stats.setdefault(name, {'calls': 0, 'rate_limited': 0, 'bytes': 0})
+        entry['calls'] += 1
+        entry['rate_limited'] += int(rate_limited)
+        entry['bytes'] += payload
+
+
+def _maybe_rate_limit(provider, name):
+    if _rng.random() < PROFILE[provider]["rate_limit_rate"]:
+        _record(name, rate_limited=True)
+        raise FakeRateLimitError(f"429 RESOURCE_EXHAUSTED (simulated by {name})")
+
+
+def _noise_png(target_bytes):
+    """A valid RGB PNG of random pixels, about target_bytes long (noise doesn't compress)"""
+    side = max(1, int(math.sqrt(target_bytes / 3)))
+    row = side * 3
+    raw = b"".join(b"\x00" + _rng.randbytes(row) for _ in range(side))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 1))
+            + chunk(b"IEND", b""))
+
+
+def _reencode(png_data, mime_type):
+    """png_data converted to another image format, e.g. image/jpeg or image/webp"""
+    import io
+    from PIL import Image
+    buffer = io.BytesIO()
+    with Image.open(io.BytesIO(png_data)) as image:
+        image.save(buffer, mime_type.split("/")[1].upper())
+    return buffer.getvalue()
+
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, joint stereo, 1152 samples
+_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + bytes(413)
+_MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def _silent_mp3(seconds):
+    return _MP3_FRAME * max(1, math.ceil(seconds / _MP3_FRAME_SECONDS))
+
+
+# --- Anthropic ---
+
+_SENTENCE = re.compile(r"[^.!?]+[.!?]*")
+
+
+def _between(text, start_marker, end_marker):
+    start = text.find(start_marker)
+    if start == -1:
+        return text
+    start += len(start_marker)
+    end = text.find(end_marker, start)
+    return text[start:end if end != -1 else None].strip()
+
+
+def _fake_scenes(prompt):
+    """Split the prompt's narrative into scenes the way the real breakdown is asked to"""
+    narrative = _between(prompt, "Narrative:\n", "\n\nCRITICAL JSON FORMATTING")
+    is_video = "for videos generation" in prompt
+    words_per_scene = 22 if is_video else 45
+    prompt_key = "video_prompt" if is_video else "image_prompt"
+
+    scenes = []
+    current = []
+    for sentence in (s.strip() for s in _SENTENCE.findall(narrative)):
+        if not sentence:
+            continue
+        current.append(sentence)
+        if sum(len(s.split()) for s in current) >= words_per_scene:
+            scenes.append(" ".join(current))
+            current = []
+    if current:
+        scenes.append(" ".join(current))
+
+    return [
+        {
+            "scene_number": number,
+            "text": text,
+            prompt_key: f"Abstract contemplative visual for scene {number}, {' '.join(text.split()[:8]).strip('.,!?')}, soft gradients",
+        }
+        for number, text in enumerate(scenes, start=1)
+    ]
+
+
+def _message(text, stop_reason="end_turn"):
+    return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], stop_reason=stop_reason)
+
+
+class _FakeMessageStream:
+    def __init__(self, text, stop_reason):
+        self._text = text
+        self._stop_reason = stop_reason
+
+    def __enter__(self):
+        _maybe_rate_limit("anthropic", "anthropic.messages.stream")  # Rate limits surface when the stream opens
+        _record("anthropic.messages.stream", payload=len(self._text))
+        _sleep(_sample(PROFILE["anthropic"]["first_token"]))
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        chunk_size = 16
+        delay = chunk_size / PROFILE["anthropic"]["chars_per_second"]
+        for i in range(0, len(self._text), chunk_size):
+            _sleep(delay)
+            yield self._text[i:i + chunk_size]
+
+    def get_final_message(self):
+        return _message(self._text, self._stop_reason)
+
+
+class FakeAnthropic:
+    """messages.create returns the prompt's input text as the narrative; messages.stream returns scene JSON"""
+
+    def __init__(self):
+        self.messages = self
+
+    def create(self, model, max_tokens, messages, **kwargs):
+        _maybe_rate_limit("anthropic", "anthropic.messages.create")
+        prompt = messages[-1]["content"]
+        narrative = _between(prompt, "Stream of consciousness:\n", "\n\nReturn only the narrative")
+        _sleep(_sample(PROFILE["anthropic"]["latency"]))
+        _record("anthropic.messages.create", payload=len(narrative))
+        return _message(narrative)
+
+    def stream(self, model, max_tokens, messages, **kwargs):
+        scenes = _fake_scenes(messages[0]["content"])
+        if messages[-1]["role"] == "assistant":
+            # Continuation after a prefill that already holds the first scenes
+            already = len(json.loads(messages[-1]["content"].rstrip(",") + "]"))
+            text = "\n" + ",\n".join(json.dumps(scene) for scene in scenes[already:]) + "\n]"
+        else:
+            text = json.dumps(scenes, indent=2)
+
+        # Roughly four characters per token; a longer response is cut off like the real API does
+        limit = max_tokens * 4
+        if len(text) > limit:
+            return _FakeMessageStream(text[:limit], "max_tokens")
+        return _FakeMessageStream(text, "end_turn")
+
+
+# --- Google: Gemini images and Veo ---
+
+class _FakeVideo:
+    def __init__(self, duration_seconds, processed_at):
+        self.id = uuid.uuid4().hex[:12]
+        self.uri = f"https://fake.local/v1beta/files/{self.id}:download?alt=media"
+        self.mime_type = "video/mp4"
+        self.duration_seconds = duration_seconds
+        self.processed_at = processed_at  # Monotonic time after which the clip can be extended
+        self.video_bytes = None
+
+    def data(self):
+        """The clip's bytes: an MP4 'ftyp' box followed by padding of a realistic size"""
+        size = int(self.duration_seconds * PROFILE["veo"]["video_bytes_per_second"])
+        header = struct.pack(">I", 24) + b"ftypmp42" + struct.pack(">I", 0) + b"mp42isom"
+        return header + bytes(max(0, size - len(header)))
+
+    def save(self, path):
+        if self.video_bytes is None:
+            raise Exception("Video not downloaded - call files.download first")
+        with open(path, 'wb') as f:
+            f.write(self.video_bytes)
+
+
+class _FakeOperation:
+    def __init__(self, duration_seconds, latency):
+        self.name = f"operations/{uuid.uuid4().hex[:12]}"
+        self.done = False
+        self.error = None
+        self.response = None
+        self._finish_at = time.monotonic() + _scaled(latency)
+        self._duration_seconds = duration_seconds
+
+
+class FakeGenAI:
+    """models.generate_content / generate_videos, operations.get and files.get / download"""
+
+    def __init__(self):
+        self.models = SimpleNamespace(generate_content=self._generate_content, generate_videos=self._generate_videos)
+        self.operations = SimpleNamespace(get=self._get_operation)
+        self.files = SimpleNamespace(get=self._get_file, download=self._download)
+
+    def _generate_content(self, model, contents, **kwargs):
+        _maybe_rate_limit("gemini_image", "google.models.generate_content")
+        _sleep(_sample(PROFILE["gemini_image"]["latency"]))
+        data = _noise_png(PROFILE["gemini_image"]["image_bytes"])
+        mime_type = PROFILE["gemini_image"]["mime_type"]
+        if mime_type != "image/png":
+            data = _reencode(data, mime_type)
+        _record("google.models.generate_content", payload=len(data))
+
+        inline_data = SimpleNamespace(data=data, mime_type=mime_type)
+
+        def as_image():
+            # Like the SDK's types.Image: save() writes the returned bytes unchanged, whatever the path
+            def save(location):
+                with open(location, 'wb') as f:
+                    f.write(data)
+            return SimpleNamespace(image_bytes=data, mime_type=mime_type, save=save)
+
+        return SimpleNamespace(parts=[SimpleNamespace(inline_data=inline_data, text=None, as_image=as_image)])
+
+    def _generate_videos(self, model, prompt=None, video=None, config=None, **kwargs):
+        _maybe_rate_limit("veo", "google.models.generate_videos")
+        _sleep(_sample(PROFILE["veo"]["submit"]))
+        if video is not None:
+            if time.monotonic() < video.processed_at:
+                _record("google.models.generate_videos.not_ready")
+                raise Exception("400 FAILED_PRECONDITION: source video is still processing")
+            duration, latency = video.duration_seconds + 7, _sample(PROFILE["veo"]["extension"])
+        else:
+            duration = (config or {}).get("duration_seconds", 8)
+            latency = _sample(PROFILE["veo"]["initial"])
+        _record("google.models.generate_videos")
+        return _FakeOperation(duration, latency)
+
+    def _get_operation(self, operation):
+        _sleep(_sample(PROFILE["veo"]["poll"]))
+        _record("google.operations.get")
+        if not operation.done and time.monotonic() >= operation._finish_at:
+            processed_at = time.monotonic() + _scaled(_sample(PROFILE["veo"]["ready"]))
+            video = _FakeVideo(operation._duration_seconds, processed_at)
+            with _lock:
+                _videos[video.id] = video
+            operation.response = SimpleNamespace(generated_videos=[SimpleNamespace(video=video)])
+            operation.done = True
+        return operation
+
+    def _get_file(self, name):
+        _record("google.files.get")
+        with _lock:
+            video = _videos.get(name.split("/")[-1])
+        if video is None:
+            raise Exception(f"404 NOT_FOUND: {name}")
+        state = "ACTIVE" if time.monotonic() >= video.processed_at else "PROCESSING"
+        return SimpleNamespace(name=name, state=SimpleNamespace(name=state))
+
+    def _download(self, file, **kwargs):
+        data = file.data()
+        _sleep(len(data) / PROFILE["veo"]["download_bytes_per_second"])
+        file.video_bytes = data
+        _record("google.files.download", payload=len(data))
+        return file.video_bytes
+
+
+class _FakeBody(io.RawIOBase):
+    """Response body that trickles out at download speed and may drop the connection"""
+
+    def __init__(self, data, fail_at=None):
+        self._data = data
+        self._position = 0
+        self._fail_at = fail_at
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self._data) - self._position
+        if self._fail_at is not None and self._position + size > self._fail_at:
+            if self._position >= self._fail_at:
+                self._fail_at = None
+                raise requests.exceptions.ConnectionError("Connection reset by peer (simulated)")
+            size = self._fail_at - self._position  # Deliver what arrived before the drop
+        chunk = self._data[self._position:self._position + size]
+        self._position += len(chunk)
+        _sleep(len(chunk) / PROFILE["veo"]["download_bytes_per_second"])
+        return chunk
+
+
+class _FakeFileAdapter(requests.adapters.BaseAdapter):
+    """Serves GET <video.uri> for the fake clips, honouring 'Range: bytes=N-'"""
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.raw = io.BytesIO(b"")
+        match = re.search(r"/files/([A-Za-z0-9_-]+)", request.url)
+        with _lock:
+            video = _videos.get(match.group(1)) if match else None
+        if video is None:
+            response.status_code = 404
+            return response
+
+        data = video.data()
+        start = 0
+        range_match = re.match(r"bytes=(\d+)-$", request.headers.get("Range", ""))
+        if range_match:
+            start = int(range_match.group(1))
+            if start >= len(data):
+                response.status_code = 416
+                response.headers["Content-Range"] = f"bytes */{len(data)}"
+                return response
+            response.status_code = 206
+            response.headers["Content-Range"] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+        else:
+            response.status_code = 200
+        body = data[start:]
+        response.headers["Content-Length"] = str(len(body))
+        response.headers["Content-Type"] = "video/mp4"
+        fail_at = None
+        if _rng.random() < PROFILE["veo"]["download_failure_rate"]:
+            fail_at = _rng.randrange(len(body))
+        response.raw = _FakeBody(body, fail_at)
+        _record("google.files.stream", payload=len(body) if fail_at is None else fail_at)
+        return response
+
+    def close(self):
+        pass
+
+
+def _files_session():
+    """requests.Session with every URL served by the fake files"""
+    session = requests.Session()
+    adapter = _FakeFileAdapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _files_client():
+    """Like clients._google_files: a FilesClient, on fake-file sessions"""
+    from video_download import FilesClient
+    return FilesClient(make_session=_files_session)
+
+
+# --- ElevenLabs ---
+
+class FakeElevenLabs:
+    """text_to_speech.convert / convert_with_timestamps producing silent MP3 of speaking length"""
+
+    def __init__(self):
+        self.text_to_speech = self
+
+    def _synthesize(self, name, text):
+        _maybe_rate_limit("elevenlabs", name)
+        settings = PROFILE["elevenlabs"]
+        _sleep(_sample(settings["latency"]) + len(text) / settings["synthesis_chars_per_second"])
+
+        # Even pacing per character, with a pause after each sentence
+        starts, ends = [], []
+        t = 0.0
+        char_seconds = 1 / settings["speech_chars_per_second"]
+        for char in text:
+            starts.append(round(t, 3))
+            t += char_seconds
+            ends.append(round(t, 3))
+            if char in ".!?":
+                t += 0.35
+        audio = _silent_mp3(t + 0.2)
+        _record(name, payload=len(audio))
+        alignment = SimpleNamespace(
+            characters=list(text),
+            character_start_times_seconds=starts,
+            character_end_times_seconds=ends,
+        )
+        return audio, alignment
+
+    def convert(self, text, voice_id, model_id=None, output_format=None, **kwargs):
+        audio, _ = self._synthesize("elevenlabs.text_to_speech.convert", text)
+        return (audio[i:i + 4096] for i in range(0, len(audio), 4096))
+
+    def convert_with_timestamps(self, text, voice_id, model_id=None, output_format=None, **kwargs):
+        audio, alignment = self._synthesize("elevenlabs.text_to_speech.convert_with_timestamps", text)
+        return SimpleNamespace(
+            audio_base_64=base64.b64encode(audio).decode("ascii"),
+            alignment=alignment,
+            normalized_alignment=alignment,
+        )
+
+
+_FACTORIES = {
+    "anthropic": FakeAnthropic,
+    "google": FakeGenAI,
+    "google_files": _files_client,
+    "elevenlabs": FakeElevenLabs,
+}
+
+
+def make_client(provider):
+    return _FACTORIES[provider]()
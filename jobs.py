@@ -0,0 +1,136 @@
+"""Background jobs that run outside the Streamlit script.
+
+A widget click, st.rerun() or a closed browser tab restarts app.py, but this module is only
+imported once per server process, so jobs submitted here keep running on the worker pool.
+The UI just polls job state and renders it.
+"""
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+MAX_EVENTS = 500  # Per-job event log is capped so long video runs don't grow without bound
+
+
+class Job:
+    """One background run: state, progress per track, an event log and a cancel flag.
+
+    All methods are thread-safe; the worker writes while the UI reads snapshots.
+    """
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex[:8]
+        self.name = name
+        self.state = "queued"  # queued -> running -> done | failed | cancelled
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self._events = []  # (timestamp, level, message)
+        self._status = {}  # track -> latest status message
+        self._progress = {}  # track -> fraction complete
+        self._lock = threading.Lock()
+
+    # Reporter interface used by pipeline.generate_assets
+
+    def log(self, level, message):
+        with self._lock:
+            self._events.append((time.time(), level, message))
+            del self._events[:-MAX_EVENTS]
+
+    def set_status(self, track, message):
+        with self._lock:
+            self._status[track] = message
+
+    def set_progress(self, track, fraction):
+        with self._lock:
+            self._progress[track] = max(0.0, min(1.0, fraction))
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.state == "queued":
+            self.state = "cancelled"
+
+    @property
+    def active(self):
+        return self.state in ("queued", "running")
+
+    def snapshot(self):
+        """Consistent copy of the job's state for rendering"""
+        with self._lock:
+            return {
+                "id": self.id,
+                "name": self.name,
+                "state": self.state,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "result": self.result,
+                "error": self.error,
+                "cancel_requested": self.cancel_event.is_set(),
+                "events": list(self._events),
+                "status": dict(self._status),
+                "progress": dict(self._progress),
+            }
+
+
+class JobManager:
+    """Runs jobs on a process-wide thread pool and keeps them addressable by ID"""
+
+    def __init__(self, max_workers=MAX_CONCURRENT_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the Job right away"""
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.state = "cancelled"
+            job.finished = time.time()
+            return
+        job.state = "running"
+        job.started = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.state = "cancelled" if job.cancel_event.is_set() else "done"
+        except Exception as e:
+            job.error = str(e)
+            job.log("error", f"❌ {str(e)}")
+            print(traceback.format_exc())
+            job.state = "failed"
+        job.finished = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        """All jobs in this server process, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Process-wide JobManager, shared by every Streamlit session"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,157 @@
+"""Content-addressed store for generated images and videos.
+
+Entries are keyed on the model name plus the exact prompt sent to the API (and the clip
+duration for Veo), so re-running a project only pays for scenes whose prompts changed.
+Cached files are hardlinked into the output folder when possible (copied otherwise), and the
+store is trimmed least-recently-used first once it grows past MEDIA_CACHE_MAX_GB. Use is
+tracked in each entry's access time: its mtime is shared with every hardlinked copy and must
+not change, since the rough cut and the thumbnails recognise unchanged files by it.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", "/mnt/user-data/cache/media"))
+MAX_CACHE_BYTES = int(float(os.getenv("MEDIA_CACHE_MAX_GB", "10")) * 1024 ** 3)
+EVICT_TO = 0.9  # Share of the budget left after a write trims the store, so the next writes don't scan again
+
+_evict_lock = threading.Lock()
+# Running size of CACHE_DIR, so a write only scans the store once it goes over budget.
+# Seeded by the first scan; other processes sharing the cache are picked up by the next one.
+_size = {"dir": None, "bytes": 0}
+
+
+def cache_key(model, prompt, duration=None):
+    """Hash of everything that determines the generated asset"""
+    payload = json.dumps({"model": model, "prompt": prompt, "duration": duration}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key, suffix):
+    return CACHE_DIR / key[:2] / f"{key}{suffix}"
+
+
+def _link_or_copy(src, dest):
+    # Output files are always replaced (never rewritten in place) by the generators,
+    # so sharing an inode with the cache entry is safe.
+    dest = Path(dest)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _touch(entry):
+    """Mark entry as recently used for LRU eviction, leaving its mtime alone"""
+    os.utime(entry, ns=(time.time_ns(), os.stat(entry).st_mtime_ns))
+
+
+def contains(key, suffix):
+    """Whether an asset with this key and file suffix is cached"""
+    return _entry_path(key, suffix).exists()
+
+
+def fetch(key, dest):
+    """Place a cached asset at dest; returns True on a cache hit"""
+    entry = _entry_path(key, Path(dest).suffix)
+    if not entry.exists():
+        return False
+    try:
+        _touch(entry)
+        _link_or_copy(entry, dest)
+    except FileNotFoundError:
+        return False  # Evicted between the check and the link
+    return True
+
+
+def load(key, suffix):
+    """Bytes of a cached entry, or None on a miss"""
+    entry = _entry_path(key, suffix)
+    try:
+        _touch(entry)
+        with open(entry, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def put(key, suffix, data):
+    """Cache bytes generated in memory (see store for files), then evict if over budget"""
+    entry = _entry_path(key, suffix)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        replaced = _size_of(entry)
+        os.replace(tmp_path, entry)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    _added(len(data) - replaced)
+
+
+def store(key, src):
+    """Add a freshly generated asset to the cache, then evict if over budget"""
+    entry = _entry_path(key, Path(src).suffix)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    # Copy (not link) so later edits to the output folder can never touch the cached bytes
+    fd, tmp_path = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        added = _size_of(tmp_path) - _size_of(entry)
+        os.replace(tmp_path, entry)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    _added(added)
+
+
+def _size_of(path):
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _added(size):
+    """Count size bytes written to the cache and evict once the running total is over budget"""
+    with _evict_lock:
+        if _size["dir"] == CACHE_DIR:
+            _size["bytes"] += size
+            if _size["bytes"] <= MAX_CACHE_BYTES:
+                return
+    evict(int(MAX_CACHE_BYTES * EVICT_TO))
+
+
+def evict(max_bytes=None):
+    """Delete least-recently-used entries until the cache fits in max_bytes"""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        entries = []
+        total = 0
+        for path in CACHE_DIR.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)  # Hardlinked copies in output folders survive this
+            total -= size
+        _size.update(dir=CACHE_DIR, bytes=total)
+        return total
@@ -0,0 +1,92 @@
+"""Minimal MP3 (MPEG Layer III) frame parsing for joining files without re-encoding.
+
+MP3 frames are not fully independent: through the bit reservoir a frame's audio data may
+start in the bytes of the frames before it. A separately encoded file starts with an empty
+reservoir, though, so whole files with the same encoding settings (e.g. ElevenLabs'
+mp3_44100_128) can be joined at their boundaries without re-encoding. Cutting a stream in
+the middle can leave the first frame after the cut without its data, which decodes as a
+few milliseconds of silence. Tags (ID3v2/ID3v1) and the Xing/Info/VBRI header frame are
+dropped so joined files don't carry stale length metadata or extra silent frames.
+"""
+
+# Layer III bitrates in kbps, indexed by the header's bitrate index
+_BITRATES_V1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG 1
+    2: [22050, 24000, 16000],  # MPEG 2
+    0: [11025, 12000, 8000],  # MPEG 2.5
+}
+
+
+def _parse_header(data, offset):
+    """(frame_length, duration_seconds, side_info_size) for a frame header at offset, or None"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3, b4 = data[offset:offset + 4]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+    version = (b2 >> 3) & 0x03
+    layer = (b2 >> 1) & 0x03
+    bitrate_index = b3 >> 4
+    sample_rate_index = (b3 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None  # Reserved values, free format or not Layer III
+
+    mpeg1 = version == 3
+    bitrate = (_BITRATES_V1 if mpeg1 else _BITRATES_V2)[bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b3 >> 1) & 0x01
+    samples = 1152 if mpeg1 else 576
+    length = (samples // 8) * bitrate // sample_rate + padding
+
+    mono = (b4 >> 6) == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    if not (b2 & 0x01):
+        side_info += 2  # CRC
+    return length, samples / sample_rate, side_info
+
+
+def _skip_id3v2(data):
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def iter_frames(data):
+    """Yield (offset, length, duration) for each audio frame, skipping tags and junk"""
+    offset = _skip_id3v2(data)
+    end = len(data)
+    if end - offset >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128  # ID3v1 trailer
+
+    first = True
+    while offset < end:
+        header = _parse_header(data, offset)
+        # Require the next frame to line up too, so random 0xFF bytes don't count as a sync
+        if header and (offset + header[0] >= end or _parse_header(data, offset + header[0])):
+            length, duration, side_info = header
+            if offset + length > end:
+                break  # Truncated final frame
+            tag_at = offset + 4 + side_info
+            is_info_frame = first and (
+                data[tag_at:tag_at + 4] in (b"Xing", b"Info") or data[offset + 36:offset + 40] == b"VBRI"
+            )
+            if not is_info_frame:
+                yield offset, length, duration
+            first = False
+            offset += length
+        else:
+            offset += 1  # Resync
+
+
+def audio_bytes(data):
+    """Just the audio frames of an MP3, with tags and info header removed"""
+    return b"".join(data[offset:offset + length] for offset, length, _ in iter_frames(data))
+
+
+def duration(data):
+    return sum(frame_duration for _, _, frame_duration in iter_frames(data))
+
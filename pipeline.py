@@ -0,0 +1,1041 @@
+"""Generation pipeline: narrative, scene breakdown, media, audio and audio splitting.
+
+Nothing here depends on a Streamlit script run, so the same functions back the UI's
+background jobs and can be driven from other entry points.
+"""
+import base64
+import functools
+import io
+import json
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from veo_scheduler import VeoScheduler, INITIAL_SECONDS, EXTENSION_SECONDS, estimate_scene_seconds, plan_scene_duration
+from rate_limit import get_limiter
+import media_cache
+import response_cache
+from clients import get_client
+from run_manifest import RunManifest, text_hash
+from scene_stream import SceneArrayParser
+from alignment import align_scenes
+import mp3_frames
+import rough_cut
+import run_metrics
+from thumbnails import get_thumbnail
+from PIL import Image
+
+OUTPUTS_ROOT = Path("/mnt/user-data/outputs")
+CLAUDE_MODEL = "claude-sonnet-4-5-20250929"
+IMAGE_MODEL = "gemini-2.5-flash-image"
+MAX_SCENE_CONTINUATIONS = 3  # Follow-up requests when the scene breakdown hits max_tokens
+TTS_VOICE_ID = "2gPFXx8pN3Avh27Dw5Ma"  # Dean's voice
+TTS_MODEL = "eleven_multilingual_v2"
+TTS_OUTPUT_FORMAT = "mp3_44100_128"
+TTS_CHUNK_CHARS = int(os.getenv("TTS_CHUNK_CHARS", "1500"))  # Longest text per request in chunked narration
+TTS_CONTEXT_CHARS = 300  # Neighbouring text sent with each chunk so prosody carries across the joins
+NARRATION_TIMING_FILE = "narration_timing.json"  # Word timings captured while synthesizing full_narrative.mp3
+SCENE_TIMINGS_FILE = "scene_timings.json"
+VIDEO_PLAN_FILE = "video_plan.json"
+
+FFMPEG_MISSING = (
+    "FFmpeg not found. Please install FFmpeg:\n"
+    "Windows: winget install ffmpeg  OR  download from https://ffmpeg.org/\n"
+    "Mac: brew install ffmpeg\n"
+    "Linux: sudo apt install ffmpeg"
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def generate_narrative(raw_text, api_key, use_cache=True):
+    """Convert stream of consciousness to poetic narrative"""
+    prompt = f"""Transform this stream of consciousness into a poetic, emotionally resonant narrative for a TikTok video about grief and healing. 
+
+Use poetic prose with challenging, abstract language. Don't simplify or dumb down the concepts - embrace complexity and depth. The language should be contemplative and intellectually engaging while maintaining raw emotional authenticity.
+
+Maintain the emotional weight and visceral honesty, but shape it into something that flows well when spoken aloud.
+
+IMPORTANT: Use only simple punctuation (periods, commas, question marks, exclamation points). Do not use em dashes or colons.
+
+Stream of consciousness:
+{raw_text}
+
+Return only the narrative, no preamble."""
+    
+    # Same inputs -> same narrative, even across restarts. Regenerate passes use_cache=False.
+    key = response_cache.cache_key("narrative", CLAUDE_MODEL, prompt, raw_text=raw_text)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            run_metrics.record_span("narrative", 0.0, cached=True)
+            return cached
+    
+    client = get_client("anthropic", api_key)
+    
+    def make_message():
+        return client.messages.create(
+            model=CLAUDE_MODEL,
+            max_tokens=2000,
+            messages=[{
+                "role": "user",
+                "content": prompt
+            }]
+        )
+    
+    with run_metrics.span("narrative"):
+        message = get_limiter("anthropic").call(make_message, on_retry=print)
+    narrative = message.content[0].text
+    run_metrics.count("anthropic", bytes=len(narrative.encode()))
+    response_cache.put(key, narrative)
+    
+    return narrative
+
+def break_into_scenes(narrative, api_key, character_info=None, media_type="Images", art_direction=None, use_cache=True, on_scene=None,
+                      status_callback=print):
+    """Break narrative into scenes with image/video prompts, calling on_scene as each one streams in.
+    
+    Warnings (a breakdown still truncated after every continuation) go to status_callback.
+    Invalid JSON raises json.JSONDecodeError, whose doc is the raw response.
+    """
+    # Build the prompt with optional character info
+    character_context = ""
+    if character_info and character_info.strip():
+        char_prompt_type = "video" if media_type == "Videos" else "image"
+        character_context = f"""
+
+CHARACTER INFORMATION (use when relevant for {char_prompt_type} prompts):
+{character_info.strip()}
+
+CRITICAL INSTRUCTIONS FOR CHARACTER CONSISTENCY:
+- When a scene mentions a character, use their COMPLETE description VERBATIM (word-for-word)
+- DO NOT paraphrase, summarize, or abbreviate character descriptions
+- DO NOT change ages, physical features, or any details
+- Copy the ENTIRE character description directly into the prompt
+- This ensures the character looks consistent across all scenes
+
+Example:
+Character info: "Dean: Moderately heavy-set man in his late 40s with short black hair and short black unkempt beard, black-framed glasses"
+CORRECT prompt: "Moderately heavy-set man in his late 40s with short black hair and short black unkempt beard, black-framed glasses standing by window"
+WRONG prompt: "Man in his 50s with beard standing by window" (too vague, changes age)
+"""
+    
+    # Build art direction context
+    art_direction_context = ""
+    if art_direction and art_direction.strip():
+        prompt_type = "video_prompt" if media_type == "Videos" else "image_prompt"
+        art_direction_context = f"""
+
+ART DIRECTION / STYLE GUIDE (CRITICAL - apply to EVERY scene):
+{art_direction.strip()}
+
+IMPORTANT: Append this style guide to the end of EVERY {prompt_type}. 
+Format: "[scene visual description]. Style: {art_direction.strip()}"
+This ensures consistent visual aesthetic across all scenes.
+"""
+    
+    # Build media-specific instructions
+    if media_type == "Videos":
+        media_instructions = """
+For each scene, provide:
+1. The text to be spoken (use only simple punctuation - periods, commas, question marks, exclamation points. No em dashes or colons)
+   CRITICAL: Keep text to 20-25 words MAX per scene (to fit within 10-second video limit)
+2. A VIDEO generation prompt with THREE components:
+   a) Visual description (abstract, contemplative, emotionally resonant - not literal)
+   b) Camera movement (e.g., "slow zoom in", "gentle pan left", "drift forward", "static shot")
+   c) Ambient sounds (e.g., "soft rain, distant thunder", "crackling fire", "wind through trees", "gentle piano melody")
+   
+CRITICAL FOR VIDEO PROMPTS:
+- NO dialogue, speech, or talking in the video
+- NO text or words visible in the video
+- DO include atmospheric/environmental sounds
+- DO include camera movement suggestions
+- The video should be SILENT except for ambient audio (no voiceover)
+- IMPORTANT: In the JSON, keep all prompts on a SINGLE LINE (no line breaks within strings)
+
+CRITICAL FOR SCENE LENGTH:
+- Each scene's text should be 20-25 words maximum (roughly 8-10 seconds when spoken)
+- This means you'll need MORE SCENES than usual (20-30+ scenes is normal)
+- Break the narrative into smaller emotional beats
+- Don't compress multiple ideas into one scene
+
+Example video_prompt: "Abandoned playground swingset moving gently in breeze, rusted chains, overcast sky. Slow zoom out. Ambient sounds: creaking metal, soft wind, distant birds."
+
+Example of valid JSON (COPY THIS FORMAT EXACTLY):
+[
+  {
+    "scene_number": 1,
+    "text": "The weight settles in my chest.",
+    "video_prompt": "Abstract stones sinking through dark water. Slow drift downward. Ambient sounds: deep underwater resonance, muffled pressure."
+  },
+  {
+    "scene_number": 2,
+    "text": "I breathe, but air feels thin.",
+    "video_prompt": "Translucent lungs struggling to expand in foggy void. Gentle zoom in. Ambient sounds: labored breathing, soft wind."
+  }
+]
+
+Return as JSON array with format:
+[
+  {
+    "scene_number": 1,
+    "text": "...",
+    "video_prompt": "..."
+  },
+  ...
+]"""
+    else:
+        media_instructions = """
+For each scene, provide:
+1. The text to be spoken (use only simple punctuation - periods, commas, question marks, exclamation points. No em dashes or colons)
+   NOTE: For images, scenes can be longer and more contemplative (30-60 words is fine)
+2. An IMAGE generation prompt that captures the emotional tone (abstract, contemplative, emotionally resonant - not literal). CRITICAL: The image should contain NO TEXT OR WORDS. Every concept must be represented through imagery alone, not written language.
+   IMPORTANT: In the JSON, keep all prompts on a SINGLE LINE (no line breaks within strings)
+
+Example of valid JSON (COPY THIS FORMAT EXACTLY):
+[
+  {
+    "scene_number": 1,
+    "text": "The weight settles in my chest like stones in deep water. I breathe, but the air feels thin, insufficient.",
+    "image_prompt": "Abstract stones sinking through dark water, heavy descent through gradient blues, minimalist composition."
+  },
+  {
+    "scene_number": 2,
+    "text": "Each day I wake expecting her voice, the familiar cadence of morning routines we built together.",
+    "image_prompt": "Empty bed bathed in morning light, rumpled sheets suggesting recent presence, window casting long shadows."
+  }
+]
+
+Return as JSON array with format:
+[
+  {
+    "scene_number": 1,
+    "text": "...",
+    "image_prompt": "..."
+  },
+  ...
+]"""
+    
+    prompt = f"""Break this narrative into scenes for {media_type.lower()} generation. Make sure that the entire narrative is accounted for. It is important that all text from the narrative land in a scene. 
+
+IMPORTANT SCENE COUNT GUIDANCE:
+{"- For VIDEO mode: Create 20-30+ scenes (each scene limited to 20-25 words to fit 10-second video limit)" if media_type == "Videos" else "- For IMAGE mode: Create as many scenes as the content needs (typically 8-16 scenes). Each scene can be longer and more contemplative."}
+{"- Break narrative into smaller emotional beats - each distinct moment should be its own scene" if media_type == "Videos" else "- Break narrative at major tonal shifts and emotional transitions - scenes can contain multiple related thoughts"}
+- Don't artificially compress multiple ideas into one scene, but also don't over-segment
+
+{media_instructions}{character_context}{art_direction_context}
+]
+
+Narrative:
+{narrative}
+
+CRITICAL JSON FORMATTING:
+- Return ONLY a valid JSON array, nothing else
+- NO markdown formatting, NO code blocks, NO backticks
+- CRITICAL: Do NOT use quotation marks (") or apostrophes (') anywhere inside the prompt text - these break JSON parsing
+- Instead of quotes, use descriptive phrases (e.g., write "so-called grief" as "apparent grief")
+- NO line breaks inside string values (use spaces instead)
+- Test: Your response should start with [ and end with ]
+
+Return only the JSON array, no markdown formatting."""
+    
+    key = response_cache.cache_key(
+        "scenes", CLAUDE_MODEL, prompt,
+        narrative=narrative, character_info=character_info, art_direction=art_direction, media_type=media_type
+    )
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            run_metrics.record_span("scenes", 0.0, cached=True, scenes=len(cached))
+            return cached
+    
+    client = get_client("anthropic", api_key)
+    scenes = []
+    reported = [0]  # Scenes passed to on_scene so far - a retried request doesn't report them twice
+    
+    def stream_request(messages):
+        """Stream one request, adding each scene the moment its JSON object closes"""
+        def consume():
+            # Every attempt parses from scratch, so a retry after a 429 or dropped stream
+            # doesn't append the scenes it already received a second time.
+            # A trailing assistant turn is a prefill that already opened the array
+            parser = SceneArrayParser(in_array=messages[-1]["role"] == "assistant")
+            received = []
+            with client.messages.stream(
+                model=CLAUDE_MODEL,
+                max_tokens=5000,  # Increased for 20-30+ scenes
+                messages=messages
+            ) as stream:
+                for text in stream.text_stream:
+                    for scene in parser.feed(text):
+                        received.append(scene)
+                        if on_scene and len(scenes) + len(received) > reported[0]:
+                            on_scene(scene)
+                            reported[0] += 1
+                return stream.get_final_message(), parser, received
+        
+        with run_metrics.span("scenes", continuation=len(messages) > 1):
+            message, parser, received = get_limiter("anthropic").call(consume, on_retry=print)
+        scenes.extend(received)
+        run_metrics.count("anthropic", bytes=len(parser.text.encode()))
+        return message, parser
+    
+    # Parse the JSON array incrementally
+    try:
+        user_message = {"role": "user", "content": prompt}
+        message, parser = stream_request([user_message])
+        
+        # If the response was truncated, keep the scenes we have and only ask for the rest
+        continuations = 0
+        while message.stop_reason == "max_tokens" and scenes and continuations < MAX_SCENE_CONTINUATIONS:
+            continuations += 1
+            print(f"Scene breakdown truncated after {len(scenes)} scenes - requesting the remainder ({continuations}/{MAX_SCENE_CONTINUATIONS})")
+            prefill = "[\n" + ",\n".join(json.dumps(scene) for scene in scenes) + ","
+            message, parser = stream_request([user_message, {"role": "assistant", "content": prefill}])
+        
+        if not scenes:
+            raise json.JSONDecodeError("No complete scene objects in response", parser.text, len(parser.text))
+        
+        # Check if response was still truncated
+        if message.stop_reason == "max_tokens":
+            status_callback("⚠️ Response was truncated (too many scenes). Try shortening your narrative or the response may be incomplete.")
+        else:
+            # Only complete breakdowns are cached - a truncated one should be retried next time
+            response_cache.put(key, scenes)
+        return scenes
+    except json.JSONDecodeError as e:
+        # e.doc holds the raw response, e.pos where parsing failed - callers can show both
+        print(f"JSON Parse Error: {e}")
+        print(f"Response length: {len(e.doc)} characters")
+        raise
+
+def generate_video(prompt, scene_text, api_key, scene_num, output_folder, status_callback=None, use_cache=True,
+                   target_seconds=None):
+    """Generate video using Veo with extensions to reach target duration (estimated from the text if not given)"""
+    client = get_client("google", api_key)
+    
+    scheduler = VeoScheduler(client, max_in_flight=1, status_callback=status_callback, use_cache=use_cache,
+                             files_client=get_client("google_files", api_key))
+    job = scheduler.add_scene(scene_num, prompt, scene_text, output_folder, target_seconds)
+    scheduler.run()
+    
+    if job.error is not None:
+        raise job.error
+    
+    return job.video_path, job.duration
+
+def generate_image(prompt, api_key, scene_num, output_folder, use_cache=True):
+    """Generate image using Gemini (nano banana)"""
+    # Add explicit instruction to avoid text in images
+    enhanced_prompt = f"{prompt}. IMPORTANT: Do not include any text, words, letters, or numbers in the image."
+    
+    image_path = output_folder / f"scene_{scene_num:02d}.png"
+    key = media_cache.cache_key(IMAGE_MODEL, enhanced_prompt)
+    if use_cache and media_cache.fetch(key, image_path):
+        run_metrics.record_span("image", 0.0, scene=scene_num, cached=True)
+        return image_path
+    
+    client = get_client("google", api_key)
+    
+    def make_image():
+        return client.models.generate_content(
+            model=IMAGE_MODEL,
+            contents=[enhanced_prompt],
+        )
+    
+    with run_metrics.span("image", scene=scene_num):
+        response = get_limiter("gemini_image").call(make_image, on_retry=lambda msg: print(f"Scene {scene_num}: {msg}"))
+    
+    # Extract and save image
+    image_saved = False
+    
+    for part in response.parts:
+        if part.inline_data is not None:
+            image_path.unlink(missing_ok=True)  # May be a hardlink into the media cache - replace, don't overwrite
+            if part.inline_data.mime_type == "image/png":
+                # Already an encoded PNG - write the bytes as returned, no decode/re-encode
+                with open(image_path, 'wb') as f:
+                    f.write(part.inline_data.data)
+            else:
+                # Other formats (JPEG, WebP) are decoded and re-encoded so the file matches its .png name
+                with Image.open(io.BytesIO(part.inline_data.data)) as image:
+                    image.save(image_path, "PNG")
+            image_saved = True
+            break
+    
+    if not image_saved:
+        raise Exception(f"No image data returned for scene {scene_num}")
+    run_metrics.count("gemini_image", bytes=image_path.stat().st_size)
+    
+    media_cache.store(key, image_path)
+    
+    # Make the preview now, on the worker thread, rather than on the first UI render
+    try:
+        get_thumbnail(image_path)
+    except Exception as e:
+        print(f"Scene {scene_num}: could not create thumbnail: {str(e)}")
+    
+    return image_path
+
+def _narrative_pieces(narrative, max_chars):
+    """(separator before the piece, text) for each paragraph, or each sentence of an over-long one"""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", narrative.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(("\n\n", paragraph))
+        else:
+            # A single sentence longer than max_chars is kept whole rather than cut mid-sentence
+            sentences = _SENTENCE_END.split(paragraph)
+            pieces.append(("\n\n", sentences[0]))
+            pieces.extend((" ", sentence) for sentence in sentences[1:])
+    return pieces
+
+def split_narrative(narrative, max_chars=TTS_CHUNK_CHARS, is_cached=None):
+    """Split text into chunks of at most max_chars at paragraph, then sentence, boundaries.
+    
+    With is_cached, chunks that already have audio (is_cached(text) is true) are kept whole
+    wherever they still appear, and new chunks end where one of them starts - so after an
+    edit only the chunks around the change need synthesizing.
+    """
+    pieces = _narrative_pieces(narrative, max_chars)
+    
+    def cached_chunk(start):
+        """(end, text) of the longest chunk with audio that starts at pieces[start], or None"""
+        if is_cached is None:
+            return None
+        found = None
+        text = pieces[start][1]
+        end = start + 1
+        while True:
+            if is_cached(text):
+                found = (end, text)
+            if end == len(pieces) or len(text) + len(pieces[end][0]) + len(pieces[end][1]) > max_chars:
+                return found
+            text += pieces[end][0] + pieces[end][1]
+            end += 1
+    
+    chunks = []
+    index = 0
+    while index < len(pieces):
+        cached = cached_chunk(index)
+        if cached is not None:
+            index, text = cached
+        else:
+            text = pieces[index][1]
+            index += 1
+            while index < len(pieces) and cached_chunk(index) is None:
+                separator, piece = pieces[index]
+                if len(text) + len(separator) + len(piece) > max_chars:
+                    break
+                text += separator + piece
+                index += 1
+        chunks.append(text)
+    return chunks
+
+def words_from_alignment(alignment, time_offset=0.0):
+    """Group ElevenLabs character timings into words with start/end times"""
+    words = []
+    current = None
+    for char, start, end in zip(alignment.characters,
+                                alignment.character_start_times_seconds,
+                                alignment.character_end_times_seconds):
+        if char.isspace():
+            current = None
+            continue
+        if current is None:
+            current = {'word': "", 'start': start + time_offset, 'end': end + time_offset}
+            words.append(current)
+        current['word'] += char
+        current['end'] = end + time_offset
+    return words
+
+def _segment_key(text):
+    """Media cache key for one chunk's narration (audio + word timings)"""
+    return media_cache.cache_key(f"elevenlabs/{TTS_MODEL}/{TTS_VOICE_ID}/{TTS_OUTPUT_FORMAT}", text)
+
+def _load_segment(text):
+    """(audio, words) for a chunk synthesized before, or None"""
+    key = _segment_key(text)
+    audio = media_cache.load(key, ".mp3")
+    words = media_cache.load(key, ".json")
+    if audio is None or words is None:
+        return None
+    return audio, json.loads(words)
+
+def generate_full_audio(narrative, api_key, output_folder, chunk_chars=None, use_cache=True):
+    """Generate complete audio for entire narrative.
+    
+    With chunk_chars set, long narratives are split into chunks that are synthesized
+    concurrently (each with its neighbours' text as context) and joined frame by frame.
+    Every chunk's audio and word timings are kept in the media cache, so after an edit only
+    the changed chunks are synthesized again and spliced in with the rest.
+    Word timings are saved to narration_timing.json.
+    """
+    client = get_client("elevenlabs", api_key)
+    limiter = get_limiter("elevenlabs")
+    
+    if not narrative.strip():
+        raise Exception("Narrative is empty - nothing to narrate")
+    
+    full_audio_path = output_folder / "full_narrative.mp3"
+    is_cached = (lambda text: media_cache.contains(_segment_key(text), ".mp3")) if use_cache else None
+    chunks = split_narrative(narrative, chunk_chars, is_cached) if chunk_chars else [narrative]
+    
+    def synthesize(index):
+        if use_cache:
+            segment = _load_segment(chunks[index])
+            if segment is not None:
+                run_metrics.record_span("tts_chunk", 0.0, chunk=index, chars=len(chunks[index]), cached=True)
+                return segment + (True,)
+        
+        context = {}
+        if index > 0:
+            context['previous_text'] = chunks[index - 1][-TTS_CONTEXT_CHARS:]
+        if index + 1 < len(chunks):
+            context['next_text'] = chunks[index + 1][:TTS_CONTEXT_CHARS]
+        
+        def request():
+            # Audio plus per-character timing, so scene boundaries need no transcription pass
+            return client.text_to_speech.convert_with_timestamps(
+                text=chunks[index],
+                voice_id=TTS_VOICE_ID,
+                model_id=TTS_MODEL,
+                output_format=TTS_OUTPUT_FORMAT,
+                **context
+            )
+        
+        with run_metrics.span("tts_chunk", chunk=index, chars=len(chunks[index])):
+            response = limiter.call(request, on_retry=print)
+        audio = base64.b64decode(response.audio_base_64)
+        run_metrics.count("elevenlabs", bytes=len(audio))
+        
+        # Stored as bare frames with chunk-relative timings, ready to splice into any narration
+        audio = mp3_frames.audio_bytes(audio)
+        words = words_from_alignment(response.alignment) if response.alignment is not None else []
+        key = _segment_key(chunks[index])
+        media_cache.put(key, ".json", json.dumps(words).encode("utf-8"))
+        media_cache.put(key, ".mp3", audio)  # Written last - it marks the segment as complete
+        return audio, words, False
+    
+    # The limiter caps how many requests are actually in flight
+    with run_metrics.span("tts", chunks=len(chunks)):
+        with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), limiter.max_concurrency))) as executor:
+            results = list(executor.map(run_metrics.bind(synthesize), range(len(chunks))))
+    reused = sum(1 for _, _, was_cached in results if was_cached)
+    if reused:
+        print(f"Narration: reused {reused} of {len(chunks)} chunks, synthesized {len(chunks) - reused}")
+    elif len(chunks) > 1:
+        print(f"Synthesized narration in {len(chunks)} chunks")
+    
+    # Each chunk's timings start at zero; shift them by the audio that precedes the chunk
+    words = []
+    segments = []
+    time_offset = 0.0
+    for audio, chunk_words, was_cached in results:
+        duration = mp3_frames.duration(audio)
+        words.extend({**word, 'start': word['start'] + time_offset, 'end': word['end'] + time_offset} for word in chunk_words)
+        segments.append({'start': round(time_offset, 3), 'end': round(time_offset + duration, 3), 'reused': was_cached})
+        time_offset += duration
+    
+    # Save full audio
+    temp_path = full_audio_path.with_suffix(".mp3.tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(b"".join(audio for audio, _, _ in results))
+    temp_path.replace(full_audio_path)
+    
+    with open(output_folder / NARRATION_TIMING_FILE, 'w') as f:
+        json.dump({'duration': round(time_offset, 3), 'words': words, 'segments': segments}, f)
+    
+    return full_audio_path
+
+def load_narration_words(output_folder):
+    """Word timings saved by generate_full_audio, or None if the folder has none (its audio is regenerated)"""
+    timing_path = Path(output_folder) / NARRATION_TIMING_FILE
+    if not timing_path.exists():
+        return None
+    with open(timing_path, 'r') as f:
+        return json.load(f)['words']
+
+def find_scene_boundaries(scenes, words):
+    """Match scenes to timed words ({'word', 'start', 'end'}) and find their start/end times"""
+    # One global alignment of all scene text against the whole narration
+    spans = align_scenes([scene['text'] for scene in scenes], [w['word'] for w in words])
+    
+    scene_boundaries = []
+    for i, (scene, span) in enumerate(zip(scenes, spans)):
+        start_time = None
+        end_time = None
+        
+        if span['first_word'] is not None:
+            start_time = words[span['first_word']]['start']
+            # End where the next located scene starts, so no audio falls between scenes
+            next_start = next((s['first_word'] for s in spans[i + 1:] if s['first_word'] is not None), None)
+            if next_start is not None:
+                end_time = words[next_start]['start']
+            elif i + 1 < len(spans):
+                end_time = words[span['last_word']]['end']
+            else:
+                # Last scene - use the last word's end time
+                end_time = words[-1]['end']
+        
+        scene_boundaries.append({
+            'scene_number': scene['scene_number'],
+            'start': start_time,
+            'end': end_time,
+            'confidence': span['confidence']
+        })
+    
+    return scene_boundaries
+
+def save_scene_timings(scenes, output_folder):
+    """Write scene_timings.json from the narration's word timings; returns the boundaries or None.
+    
+    Per-scene MP3s already in the folder are re-cut if their audio changed.
+    """
+    output_folder = Path(output_folder)
+    words = load_narration_words(output_folder)
+    if not words:
+        return None
+    timings_path = output_folder / SCENE_TIMINGS_FILE
+    previous_boundaries = None
+    if timings_path.exists():
+        with open(timings_path, 'r') as f:
+            previous_boundaries = json.load(f)
+    with run_metrics.span("scene_timings", words=len(words)):
+        scene_boundaries = find_scene_boundaries(scenes, words)
+    with open(timings_path, 'w') as f:
+        json.dump(scene_boundaries, f, indent=2)
+    refresh_scene_audio(output_folder, scene_boundaries, previous_boundaries)
+    return scene_boundaries
+
+def refresh_scene_audio(output_folder, scene_boundaries, previous_boundaries=None):
+    """Re-cut the existing per-scene MP3s whose audio changed in the last narration; returns their scene numbers.
+    
+    A scene is unchanged if it lies entirely in chunks reused from before and its length is
+    the same, even if it moved in time because an earlier chunk was edited.
+    """
+    with open(output_folder / NARRATION_TIMING_FILE, 'r') as f:
+        new_audio = [(s['start'], s['end']) for s in json.load(f).get('segments', []) if not s['reused']]
+    previous = {b['scene_number']: b for b in previous_boundaries or []}
+    
+    stale = []
+    for boundary in scene_boundaries:
+        if boundary['start'] is None or boundary['end'] is None:
+            continue
+        if not (output_folder / f"scene_{boundary['scene_number']:02d}.mp3").exists():
+            continue  # Only scenes that were cut before are kept up to date
+        old = previous.get(boundary['scene_number'])
+        same_length = (
+            old is not None and old['start'] is not None and old['end'] is not None
+            and abs((old['end'] - old['start']) - (boundary['end'] - boundary['start'])) < 0.001
+        )
+        touches_new_audio = any(start < boundary['end'] and boundary['start'] < end for start, end in new_audio)
+        if touches_new_audio or not same_length:
+            stale.append(boundary)
+    
+    if not stale:
+        return []
+    if not check_ffmpeg():
+        print(f"FFmpeg not found - scene audio for scenes {', '.join(str(b['scene_number']) for b in stale)} is out of date")
+        return []
+    split_audio_by_scenes(output_folder / "full_narrative.mp3", stale, output_folder)
+    return [b['scene_number'] for b in stale]
+
+def plan_videos(scenes, scene_boundaries=None):
+    """Choose each scene's Veo calls: one initial clip plus the fewest extensions covering its narration.
+    
+    Scenes without a measured duration fall back to the word-count estimate.
+    """
+    measured = {
+        b['scene_number']: b['end'] - b['start']
+        for b in scene_boundaries or []
+        if b['start'] is not None and b['end'] is not None
+    }
+    plan = []
+    for scene in scenes:
+        audio_seconds = measured.get(scene['scene_number'])
+        target_seconds, extensions = plan_scene_duration(scene['text'], audio_seconds)
+        _, estimated_extensions = plan_scene_duration(scene['text'])
+        plan.append({
+            'scene_number': scene['scene_number'],
+            'text_hash': text_hash(scene['text']),
+            'audio_seconds': round(audio_seconds, 2) if audio_seconds is not None else None,
+            'estimated_seconds': round(estimate_scene_seconds(scene['text']), 1),
+            'target_seconds': round(target_seconds, 2),
+            'extensions': extensions,
+            'clip_seconds': INITIAL_SECONDS + extensions * EXTENSION_SECONDS,
+            'veo_calls': 1 + extensions,
+            'word_estimate_calls': 1 + estimated_extensions,
+        })
+    return plan
+
+def load_video_plan(output_folder):
+    """video_plan.json from a folder, or None"""
+    plan_path = Path(output_folder) / VIDEO_PLAN_FILE
+    if not plan_path.exists():
+        return None
+    with open(plan_path, 'r') as f:
+        return json.load(f)
+
+def plan_targets(video_plan, scenes):
+    """scene_number -> target seconds for plan entries whose scene text is unchanged"""
+    current = {scene['scene_number']: text_hash(scene['text']) for scene in scenes}
+    return {
+        entry['scene_number']: entry['target_seconds']
+        for entry in video_plan or []
+        if entry['audio_seconds'] is not None and current.get(entry['scene_number']) == entry['text_hash']
+    }
+
+def prepare_video_plan(narrative, scenes, elevenlabs_key, output_folder, chunked_audio=True, use_cache=True):
+    """Generate (or reuse) the narration in output_folder, then plan every scene's Veo calls from it.
+    
+    Runs before any Veo call so the plan can be reviewed; generate_assets picks it up from
+    video_plan.json and skips the audio it already made.
+    """
+    output_folder = Path(output_folder)
+    manifest = RunManifest.load(output_folder, "Videos")
+    with run_metrics.recording(output_folder), run_metrics.span("video_plan"):
+        if not manifest.is_audio_complete(narrative) or load_narration_words(output_folder) is None:
+            try:
+                generate_full_audio(narrative, elevenlabs_key, output_folder,
+                                    chunk_chars=TTS_CHUNK_CHARS if chunked_audio else None, use_cache=use_cache)
+            except Exception as e:
+                manifest.mark_audio(narrative, "failed", error=e)
+                raise
+            manifest.mark_audio(narrative, "done")
+        
+        plan = plan_videos(scenes, save_scene_timings(scenes, output_folder))
+    with open(output_folder / VIDEO_PLAN_FILE, 'w') as f:
+        json.dump(plan, f, indent=2)
+    return plan
+
+@functools.lru_cache(maxsize=None)
+def check_ffmpeg():
+    """Check if FFmpeg is available (probed once per process)"""
+    try:
+        subprocess.run(['ffmpeg', '-version'], capture_output=True, check=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+def split_audio_by_scenes(full_audio_path, scene_boundaries, output_folder):
+    """Split the full audio file into individual scene files with a single FFmpeg pass"""
+    
+    # Check if FFmpeg is available
+    if not check_ffmpeg():
+        raise Exception(FFMPEG_MISSING)
+    
+    # One FFmpeg process with an output per scene: the MP3 is read once and each
+    # output keeps only its own time range.
+    # -ss: start time, -t: duration, -acodec copy: copy audio without re-encoding
+    cmd = ['ffmpeg', '-y', '-i', str(full_audio_path)]  # -y: overwrite output files if they exist
+    scene_numbers = []
+    for boundary in scene_boundaries:
+        if boundary['start'] is not None and boundary['end'] is not None:
+            scene_path = output_folder / f"scene_{boundary['scene_number']:02d}.mp3"
+            duration = boundary['end'] - boundary['start']
+            cmd += [
+                '-map', '0:a',
+                '-ss', f"{boundary['start']:.3f}",  # Fixed-point - FFmpeg rejects str(float)'s "1e-05"
+                '-t', f"{duration:.3f}",
+                '-acodec', 'copy',
+                str(scene_path)
+            ]
+            scene_numbers.append(boundary['scene_number'])
+    
+    if not scene_numbers:
+        return
+    
+    try:
+        with run_metrics.span("split_audio", scenes=len(scene_numbers)):
+            subprocess.run(cmd, check=True, capture_output=True)
+    except subprocess.CalledProcessError as e:
+        raise Exception(f"FFmpeg failed splitting scenes {', '.join(map(str, scene_numbers))}: {e.stderr.decode()}")
+
+def render_rough_cut(output_folder, scenes=None, scene_boundaries=None):
+    """Render rough_cut.mp4: each scene's media for its stretch of full_narrative.mp3; returns rough_cut.render's summary.
+    
+    scenes and scene_boundaries default to the folder's scenes.json and scene_timings.json.
+    """
+    if not check_ffmpeg():
+        raise Exception(FFMPEG_MISSING)
+    output_folder = Path(output_folder)
+    if scenes is None:
+        with open(output_folder / "scenes.json", 'r') as f:
+            scenes = json.load(f)
+    if scene_boundaries is None:
+        timings_path = output_folder / SCENE_TIMINGS_FILE
+        if not timings_path.exists():
+            raise Exception(f"No {SCENE_TIMINGS_FILE} in {output_folder} - generate the audio first")
+        with open(timings_path, 'r') as f:
+            scene_boundaries = json.load(f)
+    
+    # The narration's full length, so the picture runs until the audio ends
+    timing_path = output_folder / NARRATION_TIMING_FILE
+    if timing_path.exists():
+        with open(timing_path, 'r') as f:
+            total_seconds = json.load(f)['duration']
+    else:
+        total_seconds = max((b['end'] for b in scene_boundaries if b['end'] is not None), default=0.0)
+    
+    with run_metrics.recording(output_folder), run_metrics.span("rough_cut", scenes=len(scenes)):
+        return rough_cut.render(output_folder, [s['scene_number'] for s in scenes], scene_boundaries,
+                                output_folder / "full_narrative.mp3", total_seconds)
+
+class RunReporter:
+    """Receives progress from generate_assets - the default just prints"""
+    
+    def log(self, level, message):
+        print(message)
+    
+    def set_status(self, track, message):
+        print(message)
+    
+    def set_progress(self, track, fraction):
+        pass
+
+def create_output_folder(suffix=None):
+    """Create a new timestamped output folder (suffix keeps batch projects started together apart)"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    name = f"video_{timestamp}_{suffix}" if suffix else f"video_{timestamp}"
+    output_folder = OUTPUTS_ROOT / name
+    output_folder.mkdir(parents=True, exist_ok=True)
+    return output_folder
+
+def generate_assets(narrative, scenes, media_type, google_key, elevenlabs_key, output_folder,
+                    character_info=None, image_concurrency=4, video_concurrency=4, use_cache=True,
+                    reporter=None, cancel_event=None, chunked_audio=True, video_plan=None, metrics=None,
+                    render_cut=True):
+    """Generate every scene's media plus the full narrative audio into output_folder.
+    
+    Scenes the folder's manifest already lists as done with the same prompt are skipped, so
+    calling this again on the same folder resumes the run. Progress goes to reporter
+    ("media" and "audio" tracks); setting cancel_event stops the run at the next checkpoint.
+    Timings and API counters go into metrics (default: the active run) and run_metrics.json.
+    With render_cut (and FFmpeg installed) a rough_cut.mp4 is rendered at the end.
+    """
+    with run_metrics.recording(output_folder, metrics), run_metrics.span("assets", media_type=media_type):
+        return _generate_assets(narrative, scenes, media_type, google_key, elevenlabs_key, output_folder,
+                                character_info, image_concurrency, video_concurrency, use_cache,
+                                reporter, cancel_event, chunked_audio, video_plan, render_cut)
+
+def _generate_assets(narrative, scenes, media_type, google_key, elevenlabs_key, output_folder,
+                     character_info, image_concurrency, video_concurrency, use_cache,
+                     reporter, cancel_event, chunked_audio, video_plan, render_cut):
+    reporter = reporter or RunReporter()
+    cancel_event = cancel_event or threading.Event()
+    output_folder = Path(output_folder)
+    
+    # An existing folder keeps the media type it was started with
+    manifest = RunManifest.load(output_folder, media_type)
+    media_type = manifest.media_type or media_type
+    
+    # Save narrative
+    with open(output_folder / "narrative.txt", 'w') as f:
+        f.write(narrative)
+    
+    # Save character info if provided
+    if character_info and character_info.strip():
+        with open(output_folder / "character_info.txt", 'w') as f:
+            f.write(character_info.strip())
+    
+    # Save scene data
+    with open(output_folder / "scenes.json", 'w') as f:
+        json.dump(scenes, f, indent=2)
+    
+    # Skip scenes that already finished in this folder with the same prompt
+    pending_scenes = [s for s in scenes if not manifest.is_scene_complete(s, media_type)]
+    skipped_scenes = len(scenes) - len(pending_scenes)
+    if skipped_scenes:
+        reporter.log("info", f"⏭️ Skipping {skipped_scenes} scene(s) already completed in this folder")
+    manifest.mark_pending(pending_scenes, media_type)
+    scenes_by_num = {s['scene_number']: s for s in scenes}
+    
+    # Clip lengths from the reviewed plan (measured narration); other scenes use the word-count estimate
+    video_targets = {}
+    if media_type == "Videos":
+        video_targets = plan_targets(video_plan or load_video_plan(output_folder), scenes)
+    
+    # Track failures
+    failed_images = []
+    
+    # Step 1: Start full narrative audio in the background. It only needs the narrative,
+    # so ElevenLabs synthesis overlaps with media generation instead of waiting for it.
+    audio_result = {'success': False, 'scene_timings': None}
+    audio_thread = None
+    
+    def record_scene_timings():
+        # Scene boundaries come straight from the synthesis timings - no transcription pass
+        try:
+            audio_result['scene_timings'] = save_scene_timings(scenes, output_folder)
+        except Exception as e:
+            reporter.log("warning", f"⚠️ Could not compute scene timings: {str(e)}")
+            return
+        if audio_result['scene_timings'] is not None:
+            reporter.log("info", f"🕒 Scene timings saved to {SCENE_TIMINGS_FILE}")
+    
+    # Audio from before narration timings were recorded is synthesized again to get them
+    if manifest.is_audio_complete(narrative) and load_narration_words(output_folder) is not None:
+        reporter.set_status("audio", "✅ Audio already generated for this narrative")
+        reporter.set_progress("audio", 1.0)
+        audio_result['success'] = True
+        record_scene_timings()
+    else:
+        def run_audio():
+            try:
+                generate_full_audio(narrative, elevenlabs_key, output_folder,
+                                    chunk_chars=TTS_CHUNK_CHARS if chunked_audio else None, use_cache=use_cache)
+                manifest.mark_audio(narrative, "done")
+                reporter.set_status("audio", "✅ Audio generated successfully!")
+                reporter.set_progress("audio", 1.0)
+                audio_result['success'] = True
+                record_scene_timings()
+            except Exception as e:
+                manifest.mark_audio(narrative, "failed", error=e)
+                reporter.set_status("audio", f"❌ Error generating audio: {str(e)}")
+        
+        reporter.set_status("audio", "🎙️ Generating complete audio narrative in parallel...")
+        audio_thread = threading.Thread(target=run_metrics.bind(run_audio), daemon=True)
+        audio_thread.start()
+    
+    # Step 2: Generate all media (images or videos)
+    total_scenes = len(pending_scenes)
+    if not pending_scenes:
+        reporter.set_progress("media", 1.0)
+    elif media_type == "Videos":
+        # One scheduler drives every scene: initial generations and extension chains
+        # stay in flight together and are all polled from one loop.
+        reporter.set_status("media", f"🎥 Generating {total_scenes} videos ({video_concurrency} scenes at a time)...")
+        completed_videos = []
+        
+        def video_complete(job):
+            completed_videos.append(job.scene_num)
+            scene = scenes_by_num[job.scene_num]
+            if job.error is None:
+                reporter.log("success", f"✅ Scene {job.scene_num} complete: {job.duration}s video generated")
+                manifest.mark_scene(scene, media_type, "done", output=job.video_path, duration=job.duration)
+            else:
+                reporter.log("error", f"❌ Error generating video for scene {job.scene_num}: {str(job.error)}")
+                manifest.mark_scene(scene, media_type, "failed", error=job.error)
+                failed_images.append(job.scene_num)
+            reporter.set_progress("media", len(completed_videos) / total_scenes)
+        
+        scheduler = VeoScheduler(
+            get_client("google", google_key),
+            max_in_flight=video_concurrency,
+            status_callback=lambda msg: reporter.set_status("media", msg),
+            on_complete=video_complete,
+            use_cache=use_cache,
+            cancel_event=cancel_event,
+            files_client=get_client("google_files", google_key)
+        )
+        for scene in pending_scenes:
+            # Get the appropriate prompt key based on what's in the scene
+            prompt_key = 'video_prompt' if 'video_prompt' in scene else 'image_prompt'
+            scheduler.add_scene(scene['scene_number'], scene[prompt_key], scene['text'], output_folder,
+                                video_targets.get(scene['scene_number']))
+        scheduler.run()
+    else:  # Images
+        # Submit every scene up front; the pool keeps at most image_concurrency requests in flight
+        reporter.set_status("media", f"🎨 Generating {total_scenes} images ({image_concurrency} at a time)...")
+        executor = ThreadPoolExecutor(max_workers=image_concurrency)
+        futures = {}
+        for scene in pending_scenes:
+            prompt_key = 'video_prompt' if 'video_prompt' in scene else 'image_prompt'
+            future = executor.submit(run_metrics.bind(generate_image), scene[prompt_key], google_key, scene['scene_number'], output_folder, use_cache=use_cache)
+            futures[future] = scene
+        
+        for completed, future in enumerate(as_completed(futures), start=1):
+            scene = futures[future]
+            scene_num = scene['scene_number']
+            try:
+                image_path = future.result()
+                manifest.mark_scene(scene, media_type, "done", output=image_path)
+                reporter.set_status("media", f"🎨 Generated image {completed}/{total_scenes} (scene {scene_num})")
+            except Exception as e:
+                reporter.log("error", f"❌ Error generating image for scene {scene_num}: {str(e)}")
+                manifest.mark_scene(scene, media_type, "failed", error=e)
+                failed_images.append(scene_num)
+            reporter.set_progress("media", completed / total_scenes)
+            if cancel_event.is_set():
+                break
+        # On cancel, drop everything not yet started; in-flight requests finish in the background
+        executor.shutdown(wait=not cancel_event.is_set(), cancel_futures=True)
+    failed_images.sort()
+    
+    if cancel_event.is_set():
+        reporter.log("warning", f"⏹️ Run cancelled. Resume it later from: {output_folder}")
+        return {'output_folder': output_folder, 'failed': failed_images, 'audio_success': audio_result['success'],
+                'scene_timings': audio_result['scene_timings'], 'rough_cut': None, 'cancelled': True}
+    
+    reporter.set_status("media", f"✅ {media_type} complete!")
+    
+    # Step 3: Wait for the audio track if it is still running
+    if audio_thread is not None:
+        audio_thread.join()
+    audio_success = audio_result['success']
+    
+    # Retry failed media
+    if failed_images:
+        reporter.log("warning", f"Retrying {len(failed_images)} failed {media_type.lower()}...")
+        
+        retry_failures = []
+        for scene_num in failed_images:
+            if cancel_event.is_set():
+                retry_failures.append(scene_num)
+                continue
+            scene = scenes_by_num[scene_num]
+            # Get the appropriate prompt key
+            prompt_key = 'video_prompt' if 'video_prompt' in scene else 'image_prompt'
+            prompt = scene[prompt_key]
+            
+            reporter.set_status("media", f"🔄 Retrying {media_type.lower()[:-1]} for scene {scene_num}...")
+            try:
+                if media_type == "Videos":
+                    media_path, duration = generate_video(prompt, scene['text'], google_key, scene_num, output_folder, use_cache=use_cache,
+                                                         target_seconds=video_targets.get(scene_num))
+                else:
+                    media_path, duration = generate_image(prompt, google_key, scene_num, output_folder, use_cache=use_cache), None
+                manifest.mark_scene(scene, media_type, "done", output=media_path, duration=duration)
+                reporter.log("success", f"✅ Successfully generated {media_type.lower()[:-1]} for scene {scene_num} on retry")
+            except Exception as e:
+                reporter.log("error", f"❌ Scene {scene_num} failed again: {str(e)}")
+                manifest.mark_scene(scene, media_type, "failed", error=e)
+                retry_failures.append(scene_num)
+        
+        # Update failed list to only include ones that failed twice
+        failed_images = retry_failures
+    
+    # Rough cut for review - scenes that failed show as black
+    rough_cut_path = None
+    if render_cut and audio_success and audio_result['scene_timings'] and not cancel_event.is_set():
+        if check_ffmpeg():
+            reporter.set_status("media", "🎞️ Rendering rough cut...")
+            try:
+                cut = render_rough_cut(output_folder, scenes, audio_result['scene_timings'])
+                rough_cut_path = cut['path']
+                reporter.log("success", f"🎞️ Rough cut saved to {rough_cut.ROUGH_CUT_FILE} "
+                                        f"({cut['seconds']:.0f}s, {cut['encoded']} scene(s) encoded, {cut['reused']} reused)")
+            except Exception as e:
+                reporter.log("warning", f"⚠️ Could not render the rough cut: {str(e)}")
+            reporter.set_status("media", f"✅ {media_type} complete!")
+        else:
+            reporter.log("info", "FFmpeg not found - skipping the rough cut")
+    
+    # Summary
+    if not failed_images and audio_success:
+        reporter.log("success", f"All files saved to: {output_folder}")
+    else:
+        reporter.log("warning", f"Generation completed with some errors. Files saved to: {output_folder}")
+        if failed_images:
+            reporter.log("error", f"Failed {media_type.lower()} (after retry) for scenes: {', '.join(map(str, failed_images))}")
+        if not audio_success:
+            reporter.log("error", "Audio generation failed - check errors above")
+    
+    return {'output_folder': output_folder, 'failed': failed_images, 'audio_success': audio_success,
+            'scene_timings': audio_result['scene_timings'], 'rough_cut': rough_cut_path, 'cancelled': False}
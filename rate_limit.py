@@ -0,0 +1,233 @@
+"""Shared, adaptive rate limiting for every external API the app calls.
+
+There is one RateLimiter per provider, shared by every thread and every Streamlit rerun
+(this module is imported once, so the registry outlives app.py reruns). Each limiter combines:
+- a token bucket for request rate
+- an adaptive concurrency limit (halved on 429 / RESOURCE_EXHAUSTED, grown back slowly on success)
+- jittered exponential backoff that honors Retry-After, applied to all callers at once
+"""
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import run_metrics
+
+# Requests per minute, burst size and maximum concurrency per provider.
+# Override the rate with e.g. RATE_LIMIT_VEO_RPM=20 in .env
+PROVIDER_DEFAULTS = {
+    "gemini_image": {"rpm": 30, "burst": 4, "max_concurrency": 8},
+    "veo": {"rpm": 10, "burst": 2, "max_concurrency": 8},
+    "elevenlabs": {"rpm": 60, "burst": 2, "max_concurrency": 4},
+    "anthropic": {"rpm": 50, "burst": 2, "max_concurrency": 4},
+}
+
+
+def is_rate_limit_error(error):
+    """Check if an exception is a rate limit error (429 or RESOURCE_EXHAUSTED)"""
+    for attr in ('status_code', 'code', 'status'):
+        if getattr(error, attr, None) in (429, 'RESOURCE_EXHAUSTED'):
+            return True
+    error_str = str(error)
+    return '429' in error_str or 'RESOURCE_EXHAUSTED' in error_str or 'quota' in error_str.lower()
+
+
+def retry_after_seconds(error):
+    """Pull a server-requested wait out of an API error, or None if there isn't one"""
+    headers = getattr(error, 'headers', None)
+    response = getattr(error, 'response', None)
+    if headers is None and response is not None:
+        headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('retry-after') or headers.get('Retry-After')
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+    # Google puts the wait in the error body instead (RetryInfo: "retryDelay": "31s")
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class RateLimiter:
+    """Token bucket + adaptive concurrency limit shared by every call to one provider"""
+
+    def __init__(self, name, rpm, burst=1, max_concurrency=4, min_concurrency=1, max_retries=5, initial_backoff=30):
+        self.name = name
+        self.base_rate = rpm / 60.0  # Tokens per second
+        self.rate = self.base_rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0  # Shared cooldown after a 429 - nobody submits before this
+        self.in_flight = 0
+        self.queue_depth = 0  # Callers blocked in acquire()
+        self.backlog = 0  # Work waiting in non-blocking schedulers (see note_backlog)
+
+        self.calls = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _wait_time(self, now):
+        """Seconds until a request may go out, 0 if it can go now (caller holds the lock)"""
+        self._refill(now)
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.concurrency_limit):
+            return None  # Wait for a release() notification
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0
+
+    def try_acquire(self):
+        """Take a slot and a token without blocking; returns False if the caller should try later"""
+        with self._cond:
+            if self._wait_time(time.monotonic()) != 0:
+                return False
+            self._tokens -= 1
+            self.in_flight += 1
+            self.calls += 1
+            return True
+
+    def acquire(self):
+        """Block until a slot and a token are available"""
+        with self._cond:
+            self.queue_depth += 1
+            try:
+                while True:
+                    wait = self._wait_time(time.monotonic())
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=wait)
+                self._tokens -= 1
+                self.in_flight += 1
+                self.calls += 1
+            finally:
+                self.queue_depth -= 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    def record_success(self):
+        """Additive increase: creep concurrency and rate back up after each clean call"""
+        with self._cond:
+            if self.concurrency_limit < self.max_concurrency:
+                self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate * 1.1)
+            self._cond.notify_all()
+
+    def record_rate_limit(self, error, attempt):
+        """Multiplicative decrease plus a shared, jittered cooldown; returns the wait in seconds"""
+        with self._cond:
+            self.rate_limited += 1
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            self.rate = max(self.base_rate / 16, self.rate / 2)
+
+            backoff = self.initial_backoff * (2 ** (attempt - 1))
+            delay = backoff / 2 + random.uniform(0, backoff / 2)  # Jitter so callers don't retry in lockstep
+            retry_after = retry_after_seconds(error)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay
+
+    def note_backlog(self, count):
+        """Let a non-blocking scheduler report how much work is waiting on this provider"""
+        with self._cond:
+            self.backlog = count
+
+    def call(self, api_call, on_retry=None):
+        """Run api_call under this limiter, retrying rate-limit errors with shared backoff"""
+        for attempt in range(1, self.max_retries + 1):
+            queued_at = time.monotonic()
+            self.acquire()
+            run_metrics.count(self.name, calls=1, queue_wait_s=time.monotonic() - queued_at)
+            try:
+                result = api_call()
+            except Exception as e:
+                self.release()
+                if not is_rate_limit_error(e):
+                    raise  # Not a rate limit error, raise immediately
+                delay = self.record_rate_limit(e, attempt)
+                run_metrics.count(self.name, rate_limited=1)
+                if attempt >= self.max_retries:
+                    if on_retry:
+                        on_retry(f"{self.name}: Rate limit - max retries reached")
+                    raise
+                self.retries += 1
+                run_metrics.count(self.name, retries=1)
+                if on_retry:
+                    on_retry(f"{self.name}: Rate limit hit. Waiting {delay:.0f}s before retry {attempt}/{self.max_retries}...")
+                # acquire() sleeps through the shared cooldown, so there's no separate sleep here
+                continue
+            self.release()
+            self.record_success()
+            return result
+
+    def stats(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "provider": self.name,
+                "rate_rpm": round(self.rate * 60, 1),
+                "concurrency_limit": int(self.concurrency_limit),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth + self.backlog,
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+                "cooldown_s": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Return the process-wide limiter for a provider, creating it on first use"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            settings = dict(PROVIDER_DEFAULTS[provider])
+            env_rpm = os.getenv(f"RATE_LIMIT_{provider.upper()}_RPM")
+            if env_rpm:
+                settings["rpm"] = float(env_rpm)
+            _limiters[provider] = RateLimiter(provider, **settings)
+        return _limiters[provider]
+
+
+def all_limiter_stats():
+    """Stats for every provider that has been used so far"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
+
+
+def reset_limiters():
+    """Forget every limiter so the next get_limiter() call starts fresh from PROVIDER_DEFAULTS"""
+    with _limiters_lock:
+        _limiters.clear()
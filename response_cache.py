@@ -0,0 +1,41 @@
+"""Persistent cache for Claude text responses (narrative + scene breakdown).
+
+Results are stored as small JSON files keyed on the model, the full prompt and the raw inputs,
+so they survive Streamlit reruns and server restarts. Regenerate actions call with
+use_cache=False, which skips the lookup and overwrites the entry.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("RESPONSE_CACHE_DIR", "/mnt/user-data/cache/responses"))
+
+
+def cache_key(kind, model, prompt, **inputs):
+    payload = json.dumps({"kind": kind, "model": model, "prompt": prompt, "inputs": inputs}, sort_keys=True)
+    return f"{kind}_{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def get(key):
+    """Cached value for key, or None"""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)["value"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def put(key, value):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"value": value}, f)
+        os.replace(tmp_path, CACHE_DIR / f"{key}.json")  # Atomic, so a crash never leaves half an entry
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
@@ -0,0 +1,172 @@
+"""Timed rough-cut MP4 of a run: every scene's image or clip laid over the narration.
+
+Each scene is encoded into its own segment with identical settings, several at once across
+CPU cores, then the segments are joined with FFmpeg's concat demuxer without re-encoding and
+the narration is muxed in as-is. Segments are named after their source file and length, so
+after an edit only the scenes whose media or timing changed are encoded again.
+"""
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import run_metrics
+
+ROUGH_CUT_FILE = "rough_cut.mp4"
+SEGMENT_DIR = ".rough_cut"  # Hidden, so dragging the output folder into an editor skips it
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))  # Segments encoded at once
+WIDTH, HEIGHT, FPS = 1280, 720, 24  # Veo's 720p output
+X264_PRESET = "veryfast"
+X264_CRF = 23
+
+
+def scene_timeline(scene_numbers, scene_boundaries, total_seconds):
+    """[(scene_number, start, end)] covering 0..total_seconds without gaps.
+
+    The first scene starts at 0 and each located scene runs until the next one starts.
+    Scenes that weren't found in the audio share the time of the located scene before them.
+    """
+    if not scene_numbers:
+        return []
+    starts = {b['scene_number']: b['start'] for b in scene_boundaries if b['start'] is not None}
+    anchors = [(0, 0.0)]
+    for index, scene_number in enumerate(scene_numbers[1:], start=1):
+        if scene_number in starts:
+            anchors.append((index, max(anchors[-1][1], min(starts[scene_number], total_seconds))))
+    anchors.append((len(scene_numbers), max(anchors[-1][1], total_seconds)))
+
+    timeline = []
+    for (index, start), (next_index, end) in zip(anchors, anchors[1:]):
+        share = (end - start) / (next_index - index)
+        for offset in range(next_index - index):
+            timeline.append((scene_numbers[index + offset], start + offset * share, start + (offset + 1) * share))
+    return timeline
+
+
+def scene_source(output_folder, scene_number):
+    """The scene's clip, else its image, else None (rendered as black)"""
+    for suffix in (".mp4", ".png"):
+        path = Path(output_folder) / f"scene_{scene_number:02d}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def _segment_key(source, frames):
+    """Changes whenever the segment would come out differently"""
+    stat = source.stat() if source is not None else None
+    payload = json.dumps({
+        'source': source.name if source is not None else None,
+        'size': stat.st_size if stat else None,
+        'mtime_ns': stat.st_mtime_ns if stat else None,
+        'frames': frames,
+        'settings': [WIDTH, HEIGHT, FPS, X264_PRESET, X264_CRF],
+    })
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _segment_command(source, frames, dest, threads):
+    """FFmpeg command encoding exactly frames frames of source into dest"""
+    video_filter = (
+        f"scale={WIDTH}:{HEIGHT}:force_original_aspect_ratio=decrease,"
+        f"pad={WIDTH}:{HEIGHT}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={FPS}"
+    )
+    if source is None:
+        inputs = ['-f', 'lavfi', '-i', f"color=c=black:s={WIDTH}x{HEIGHT}:r={FPS}"]
+    elif source.suffix == ".png":
+        # Decode and scale the image once, then repeat the frame (looping the input re-scales every frame)
+        inputs = ['-i', str(source)]
+        video_filter += f",loop=loop=-1:size=1,setpts=N/{FPS}/TB"
+    else:
+        inputs = ['-i', str(source)]
+        # A clip shorter than its narration holds its last frame
+        video_filter += f",tpad=stop_mode=clone:stop_duration={frames / FPS:.3f}"
+    return [
+        'ffmpeg', '-y', '-loglevel', 'error', *inputs,
+        '-vf', f"{video_filter},format=yuv420p",
+        '-r', str(FPS), '-frames:v', str(frames), '-an',  # Same rate and timebase in every segment, so they join cleanly
+        '-c:v', 'libx264', '-preset', X264_PRESET, '-crf', str(X264_CRF), '-threads', str(threads),
+        '-f', 'mp4', str(dest)
+    ]
+
+
+def _encode_segment(scene_number, source, frames, dest, threads):
+    """Encode one scene's segment (on a render worker); returns True if it had to be encoded"""
+    if dest.exists():
+        return False  # Same source and length as last time
+    temp_path = dest.with_name(f"{dest.name}.part")
+    with run_metrics.span("rough_cut_segment", scene=scene_number, frames=frames):
+        try:
+            subprocess.run(_segment_command(source, frames, temp_path, threads), check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            temp_path.unlink(missing_ok=True)
+            raise Exception(f"FFmpeg failed encoding scene {scene_number}: {e.stderr.decode()}")
+    os.replace(temp_path, dest)
+    return True
+
+
+def render(output_folder, scene_numbers, scene_boundaries, audio_path, total_seconds, workers=None):
+    """Encode every scene's segment in parallel, join them and mux in audio_path; returns a summary.
+
+    Timing comes from scene_timeline; frame counts are taken from the cumulative timeline so
+    rounding never drifts the picture away from the narration.
+    """
+    output_folder = Path(output_folder)
+    segment_dir = output_folder / SEGMENT_DIR
+    segment_dir.mkdir(exist_ok=True)
+
+    segments = []
+    for scene_number, start, end in scene_timeline(scene_numbers, scene_boundaries, total_seconds):
+        frames = round(end * FPS) - round(start * FPS)
+        if frames <= 0:
+            continue
+        source = scene_source(output_folder, scene_number)
+        dest = segment_dir / f"scene_{scene_number:02d}_{_segment_key(source, frames)}.mp4"
+        segments.append((scene_number, source, frames, dest))
+    if not segments:
+        raise Exception("Nothing to render - the narration has no length")
+
+    workers = max(1, min(workers or RENDER_WORKERS, len(segments)))
+    threads = max(1, (os.cpu_count() or 1) // workers)  # Split the cores between the encoders running at once
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render") as executor:
+        futures = [
+            executor.submit(run_metrics.bind(_encode_segment), scene_number, source, frames, dest, threads)
+            for scene_number, source, frames, dest in segments
+        ]
+        encoded = [future.result() for future in futures]
+
+    # Segments from earlier renders that no longer match any scene
+    current = {dest for _, _, _, dest in segments}
+    for stale in segment_dir.glob("scene_*.mp4"):
+        if stale not in current:
+            stale.unlink()
+
+    list_path = segment_dir / "concat.txt"
+    with open(list_path, 'w') as f:
+        f.writelines(f"file '{dest.name}'\n" for _, _, _, dest in segments)
+
+    rough_cut_path = output_folder / ROUGH_CUT_FILE
+    temp_path = rough_cut_path.with_name(f"{rough_cut_path.name}.part")
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', str(list_path),
+        '-i', str(audio_path),
+        '-map', '0:v', '-map', '1:a', '-c', 'copy',  # Segments share one encoding, so nothing is re-encoded
+        '-movflags', '+faststart', '-f', 'mp4', str(temp_path)
+    ]
+    with run_metrics.span("rough_cut_concat", segments=len(segments)):
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            temp_path.unlink(missing_ok=True)
+            raise Exception(f"FFmpeg failed joining the rough cut: {e.stderr.decode()}")
+    os.replace(temp_path, rough_cut_path)
+
+    return {
+        'path': rough_cut_path,
+        'seconds': round(sum(frames for _, _, frames, _ in segments) / FPS, 2),
+        'encoded': sum(encoded),
+        'reused': len(encoded) - sum(encoded),
+    }
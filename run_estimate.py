@@ -0,0 +1,133 @@
+"""Pre-flight estimate of a Videos run: Veo calls per scene and expected wall time.
+
+Calls are counted with the scheduler's own SceneJob, so the plan matches what the run will
+submit (including scenes the media cache or the folder's manifest will skip). Wall time comes
+from the latency history in veo_latency: each scene's chain takes an initial generation,
+then a readiness wait plus an extension per extension, then a download, and chains run
+video_concurrency at a time under the Veo rate limit.
+"""
+import heapq
+
+import media_cache
+from rate_limit import get_limiter
+from run_manifest import RunManifest
+from veo_latency import get_latency_tracker
+from veo_scheduler import SceneJob
+
+# Per-operation seconds used until the latency log has enough samples of a kind
+DEFAULT_SECONDS = {"initial": 90, "extension": 90, "ready": 15, "download": 5}
+TYPICAL_QUANTILE = 0.5
+SLOW_QUANTILE = 0.9
+
+
+def operation_seconds(kind, q):
+    """(seconds, from_history) for one operation of kind at latency quantile q"""
+    seconds = get_latency_tracker().quantile(kind, q)
+    if seconds is None:
+        return DEFAULT_SECONDS[kind], False
+    return seconds, True
+
+
+def chain_seconds(extensions, q):
+    """Time for one scene's chain: initial clip, each readiness wait + extension, download"""
+    initial, _ = operation_seconds("initial", q)
+    ready, _ = operation_seconds("ready", q)
+    extension, _ = operation_seconds("extension", q)
+    download, _ = operation_seconds("download", q)
+    return initial + extensions * (ready + extension) + download
+
+
+def schedule_seconds(durations, concurrency):
+    """Makespan of running durations in order, concurrency at a time (as the scheduler starts them)"""
+    slots = [0.0] * max(1, min(concurrency, len(durations)))
+    for duration in durations:
+        heapq.heappush(slots, heapq.heappop(slots) + duration)
+    return max(slots) if durations else 0.0
+
+
+def format_duration(seconds):
+    """'1h 05m', '4m 10s' or '35s'"""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def estimate_video_run(scenes, targets=None, concurrency=4, use_cache=True, output_folder=None):
+    """Veo calls and wall time for generating scenes' videos.
+
+    targets maps scene_number -> measured seconds (see pipeline.plan_targets); other scenes use
+    the word-count estimate, as in the run itself. With output_folder, scenes its manifest
+    already lists as done are left out, as a resumed run would.
+    """
+    manifest = RunManifest.load(output_folder) if output_folder else None
+    targets = targets or {}
+
+    per_scene = []
+    for scene in scenes:
+        prompt = scene['video_prompt'] if 'video_prompt' in scene else scene['image_prompt']
+        job = SceneJob(scene['scene_number'], prompt, scene['text'], output_folder, targets.get(scene['scene_number']))
+        if manifest is not None and manifest.is_scene_complete(scene, "Videos"):
+            status = "done"
+        elif use_cache and media_cache.contains(job.cache_key, ".mp4"):
+            status = "cached"
+        else:
+            status = "generate"
+        per_scene.append({
+            'scene_number': job.scene_num,
+            'status': status,
+            'extensions': job.extensions_needed,
+            'veo_calls': 1 + job.extensions_needed if status == "generate" else 0,
+            'seconds': round(chain_seconds(job.extensions_needed, TYPICAL_QUANTILE), 1) if status == "generate" else 0.0,
+        })
+
+    generating = [entry for entry in per_scene if entry['status'] == "generate"]
+    limiter = get_limiter("veo")
+    concurrency = max(1, min(concurrency, limiter.max_concurrency))
+    veo_calls = sum(entry['veo_calls'] for entry in generating)
+    # Submissions can't outpace the rate limit however many chains run at once
+    rate_floor = max(0.0, veo_calls - limiter.burst) / limiter.base_rate
+
+    wall = {}
+    for label, q in (("typical", TYPICAL_QUANTILE), ("slow", SLOW_QUANTILE)):
+        durations = [chain_seconds(entry['extensions'], q) for entry in generating]
+        wall[label] = max(schedule_seconds(durations, concurrency), rate_floor)
+
+    history = {kind: operation_seconds(kind, TYPICAL_QUANTILE)[1] for kind in DEFAULT_SECONDS}
+    return {
+        'scenes': len(per_scene),
+        'generate_scenes': len(generating),
+        'cached_scenes': sum(1 for entry in per_scene if entry['status'] == "cached"),
+        'done_scenes': sum(1 for entry in per_scene if entry['status'] == "done"),
+        'initial_calls': len(generating),
+        'extension_calls': sum(entry['extensions'] for entry in generating),
+        'veo_calls': veo_calls,
+        'concurrency': concurrency,
+        'wall_seconds': round(wall["typical"], 1),
+        'slow_wall_seconds': round(wall["slow"], 1),
+        'rate_floor_seconds': round(rate_floor, 1),
+        'history': history,  # kind -> True if timed from past runs, False if from DEFAULT_SECONDS
+        'per_scene': per_scene,
+    }
+
+
+def describe_estimate(estimate):
+    """One-paragraph summary of estimate_video_run's result"""
+    skipped = []
+    if estimate['cached_scenes']:
+        skipped.append(f"{estimate['cached_scenes']} cached")
+    if estimate['done_scenes']:
+        skipped.append(f"{estimate['done_scenes']} already done")
+    text = (
+        f"{estimate['veo_calls']} Veo calls ({estimate['initial_calls']} initial + {estimate['extension_calls']} extensions) "
+        f"for {estimate['generate_scenes']}/{estimate['scenes']} scenes"
+        + (f" ({', '.join(skipped)})" if skipped else "")
+        + f". About {format_duration(estimate['wall_seconds'])} at {estimate['concurrency']} scenes at a time"
+        + f", up to {format_duration(estimate['slow_wall_seconds'])} if Veo runs slow."
+    )
+    defaults = [kind for kind, from_history in estimate['history'].items() if not from_history]
+    if defaults:
+        text += f" Not enough history yet for {', '.join(defaults)} - using default timings."
+    return text
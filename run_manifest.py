@@ -0,0 +1,134 @@
+"""Per-run manifest so an interrupted "Generate All Assets" can be resumed.
+
+Each output folder carries a manifest.json recording, for every scene, a hash of what was
+requested, its status, the output file and its duration. Resuming skips scenes that are done
+with a matching hash and regenerates only what is missing, failed or stale.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+
+
+def prompt_hash(scene, media_type):
+    """Hash of everything that determines a scene's media"""
+    prompt_key = 'video_prompt' if 'video_prompt' in scene else 'image_prompt'
+    payload = {"media_type": media_type, "prompt": scene[prompt_key]}
+    if media_type == "Videos":
+        payload["text"] = scene['text']  # Scene text drives the clip duration
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class RunManifest:
+    """manifest.json for one output folder; every update is written to disk immediately"""
+
+    def __init__(self, output_folder, data):
+        self.output_folder = Path(output_folder)
+        self.data = data
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, output_folder, media_type=None):
+        """Load the folder's manifest, or start a new one"""
+        path = Path(output_folder) / MANIFEST_NAME
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(output_folder, json.load(f))
+        return cls(output_folder, {
+            "media_type": media_type,
+            "created": datetime.now().isoformat(timespec='seconds'),
+            "scenes": {},
+            "audio": {},
+        })
+
+    @property
+    def media_type(self):
+        return self.data.get("media_type")
+
+    def save(self):
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=self.output_folder, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.output_folder / MANIFEST_NAME)
+
+    def scene_entry(self, scene_num):
+        return self.data["scenes"].get(str(scene_num))
+
+    def is_scene_complete(self, scene, media_type):
+        """True if the scene finished with the same prompt and its file is still there"""
+        entry = self.scene_entry(scene['scene_number'])
+        return bool(
+            entry
+            and entry.get("status") == "done"
+            and entry.get("prompt_hash") == prompt_hash(scene, media_type)
+            and entry.get("output")
+            and (self.output_folder / entry["output"]).exists()
+        )
+
+    def mark_pending(self, scenes, media_type):
+        """Record the scenes about to be generated in one write"""
+        with self._lock:
+            for scene in scenes:
+                self.data["scenes"][str(scene['scene_number'])] = {
+                    "prompt_hash": prompt_hash(scene, media_type),
+                    "status": "pending",
+                    "output": None,
+                    "duration": None,
+                    "error": None,
+                    "updated": datetime.now().isoformat(timespec='seconds'),
+                }
+        self.save()
+
+    def mark_scene(self, scene, media_type, status, output=None, duration=None, error=None):
+        with self._lock:
+            self.data["scenes"][str(scene['scene_number'])] = {
+                "prompt_hash": prompt_hash(scene, media_type),
+                "status": status,
+                "output": Path(output).name if output else None,
+                "duration": duration,
+                "error": str(error) if error else None,
+                "updated": datetime.now().isoformat(timespec='seconds'),
+            }
+        self.save()
+
+    def is_audio_complete(self, narrative):
+        audio = self.data.get("audio", {})
+        return (
+            audio.get("status") == "done"
+            and audio.get("narrative_hash") == text_hash(narrative)
+            and (self.output_folder / "full_narrative.mp3").exists()
+        )
+
+    def mark_audio(self, narrative, status, error=None):
+        with self._lock:
+            self.data["audio"] = {
+                "narrative_hash": text_hash(narrative),
+                "status": status,
+                "error": str(error) if error else None,
+                "updated": datetime.now().isoformat(timespec='seconds'),
+            }
+        self.save()
+
+    def summary(self):
+        """(done, total) scene counts"""
+        scenes = self.data["scenes"].values()
+        return sum(1 for entry in scenes if entry.get("status") == "done"), len(scenes)
+
+
+def find_runs(outputs_root):
+    """Output folders that have a manifest, newest first"""
+    root = Path(outputs_root)
+    if not root.exists():
+        return []
+    runs = [folder for folder in root.iterdir() if (folder / MANIFEST_NAME).exists()]
+    return sorted(runs, key=lambda folder: folder.name, reverse=True)
@@ -0,0 +1,199 @@
+"""Per-run timing spans and API counters, saved as run_metrics.json next to scenes.json.
+
+The run being measured lives in a context variable, so the rate limiter, the Veo scheduler
+and the pipeline record into whichever run started the work without a metrics object being
+passed through every call. Work handed to another thread is wrapped with bind() so it keeps
+recording into the same run. With no active run every recording call is a no-op.
+
+A run attached to an output folder is saved as its spans finish (at most every SAVE_INTERVAL
+seconds) and once more when recording() exits, so a crashed process leaves its metrics behind.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+METRICS_FILE = "run_metrics.json"
+COUNTER_FIELDS = ("calls", "retries", "rate_limited", "bytes", "queue_wait_s")
+SAVE_INTERVAL = 5.0  # Seconds between saves while a run is in progress
+
+_current = contextvars.ContextVar("run_metrics", default=None)
+
+
+class RunMetrics:
+    """Timing spans and per-provider counters for one run (thread-safe)"""
+
+    def __init__(self):
+        self.spans = []  # {'name', 'scene', 'start' (epoch seconds), 'seconds', 'attrs'}
+        self.counters = {}  # provider -> {field: total}
+        self.output_folder = None
+        self._previous = {'spans': [], 'counters': {}}  # Already in run_metrics.json when attached
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._last_save = 0.0
+
+    def record_span(self, name, seconds, scene=None, end=None, **attrs):
+        """Add a span that lasted seconds and ended at end (epoch seconds, default now)"""
+        end = time.time() if end is None else end
+        span = {'name': name, 'scene': scene, 'start': round(end - seconds, 3), 'seconds': round(seconds, 3), 'attrs': attrs}
+        with self._lock:
+            self.spans.append(span)
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Could not save run metrics: {str(e)}")  # Tried again with the next span
+
+    @contextlib.contextmanager
+    def span(self, name, scene=None, **attrs):
+        """Time the with-block as a span; attrs may be filled in inside the block"""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException:
+            attrs['error'] = True
+            raise
+        finally:
+            self.record_span(name, time.perf_counter() - start, scene=scene, **attrs)
+
+    def count(self, provider, **amounts):
+        """Add to provider's counters (calls, retries, rate_limited, bytes, queue_wait_s)"""
+        with self._lock:
+            totals = self.counters.setdefault(provider, dict.fromkeys(COUNTER_FIELDS, 0))
+            for field, amount in amounts.items():
+                totals[field] += amount
+
+    def attach(self, output_folder):
+        """Save into output_folder from now on, keeping whatever earlier sessions recorded there"""
+        output_folder = Path(output_folder)
+        if self.output_folder == output_folder:
+            return
+        self.output_folder = output_folder
+        self._previous = load(output_folder) or {'spans': [], 'counters': {}}
+
+    def to_dict(self):
+        with self._lock:
+            spans = self._previous['spans'] + self.spans
+            counters = {provider: dict(totals) for provider, totals in self._previous['counters'].items()}
+            for provider, totals in self.counters.items():
+                merged = counters.setdefault(provider, dict.fromkeys(COUNTER_FIELDS, 0))
+                for field, amount in totals.items():
+                    merged[field] = round(merged.get(field, 0) + amount, 3)
+        return {'spans': sorted(spans, key=lambda span: span['start']), 'counters': counters}
+
+    def save(self):
+        """Write run_metrics.json into the attached folder (atomically)"""
+        if self.output_folder is None:
+            return
+        metrics_path = self.output_folder / METRICS_FILE
+        temp_path = metrics_path.with_suffix(".json.tmp")
+        with self._save_lock:  # Spans finishing on several threads may all be due a save
+            self._last_save = time.monotonic()
+            with open(temp_path, 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(temp_path, metrics_path)
+
+
+def current():
+    """The run being recorded on this thread, or None"""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def activate(metrics):
+    """Record into metrics for the duration of the with-block"""
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def recording(output_folder, metrics=None):
+    """Record into metrics (default: the active run, else a new one) and save it to output_folder afterwards"""
+    metrics = metrics or current() or RunMetrics()
+    metrics.attach(output_folder)
+    try:
+        with activate(metrics):
+            yield metrics
+    finally:
+        metrics.save()
+
+
+def bind(fn):
+    """Wrap fn so it records into the caller's current run when it runs on another thread"""
+    metrics = current()
+
+    def run(*args, **kwargs):
+        with activate(metrics):
+            return fn(*args, **kwargs)
+    return run
+
+
+def span(name, scene=None, **attrs):
+    """Time a with-block in the current run (no-op without one)"""
+    metrics = current()
+    if metrics is None:
+        return contextlib.nullcontext(attrs)
+    return metrics.span(name, scene=scene, **attrs)
+
+
+def record_span(name, seconds, scene=None, **attrs):
+    metrics = current()
+    if metrics is not None:
+        metrics.record_span(name, seconds, scene=scene, **attrs)
+
+
+def count(provider, **amounts):
+    metrics = current()
+    if metrics is not None:
+        metrics.count(provider, **amounts)
+
+
+def load(output_folder):
+    """run_metrics.json from a folder, or None"""
+    metrics_path = Path(output_folder) / METRICS_FILE
+    if not metrics_path.exists():
+        return None
+    with open(metrics_path, 'r') as f:
+        return json.load(f)
+
+
+def _covered_seconds(intervals):
+    """Length of the union of (start, end) intervals - concurrent work counts once"""
+    total = 0.0
+    covered_until = None
+    for start, end in sorted(intervals):
+        if covered_until is None or start > covered_until:
+            total += end - start
+            covered_until = end
+        elif end > covered_until:
+            total += end - covered_until
+            covered_until = end
+    return total
+
+
+def summarize(data):
+    """Per span name: count, wall seconds covered, summed seconds and the slowest one, slowest first"""
+    by_name = {}
+    for span in data['spans']:
+        by_name.setdefault(span['name'], []).append(span)
+    rows = []
+    for name, spans in by_name.items():
+        rows.append({
+            'stage': name,
+            'count': len(spans),
+            'wall_s': round(_covered_seconds((s['start'], s['start'] + s['seconds']) for s in spans), 2),
+            'total_s': round(sum(s['seconds'] for s in spans), 2),
+            'max_s': round(max(s['seconds'] for s in spans), 2),
+        })
+    return sorted(rows, key=lambda row: row['wall_s'], reverse=True)
+
+
+def total_wall_seconds(data):
+    """Time during which anything in the run was happening (idle gaps between sessions excluded)"""
+    return round(_covered_seconds((s['start'], s['start'] + s['seconds']) for s in data['spans']), 2)
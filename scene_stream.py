@@ -0,0 +1,63 @@
+"""Incremental parser for the streamed scene breakdown JSON array"""
+import json
+
+
+class SceneArrayParser:
+    """Feed streamed text in; get back each top-level object of a JSON array as soon as it closes.
+
+    Anything before the opening '[' (e.g. a stray ```json fence) is ignored. Only string and
+    brace state is tracked, and each character is scanned once.
+    """
+
+    def __init__(self, in_array=False):
+        self.text = ""  # Everything received, for error reporting
+        self._pos = 0
+        self._in_array = in_array  # True when continuing an array whose '[' was already sent
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+        self.closed = False  # Saw the array's closing ']'
+
+    def feed(self, chunk):
+        """Consume a chunk of text; returns the list of objects completed by it"""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if not self._in_array:
+                if ch == '[':
+                    self._in_array = True
+                continue
+            if self.closed:
+                break
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._object_start = i
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads(text[self._object_start:i + 1]))
+                    except json.JSONDecodeError as e:
+                        # Report the position within the whole response, not just this object
+                        raise json.JSONDecodeError(e.msg, text, self._object_start + e.pos) from None
+                    self._object_start = None
+            elif ch == ']' and self._depth == 0:
+                self.closed = True
+        self._pos = len(text)
+        return completed
@@ -0,0 +1,107 @@
+"""Small preview images for the UI, generated once per asset.
+
+Thumbnails are keyed on the source image's content, so the same image reached through
+different output folders (or cache hardlinks) shares one thumbnail, and an image replaced by
+a regeneration gets a new one. The directory is trimmed least-recently-used first once it
+grows past THUMBNAIL_MAX_MB; a trimmed thumbnail is simply made again when next shown.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from PIL import Image, features
+
+THUMBNAIL_DIR = Path(os.getenv("THUMBNAIL_DIR", "/mnt/user-data/cache/thumbnails"))
+THUMBNAIL_SIZE = 512  # Longest side in pixels
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+MAX_THUMBNAIL_BYTES = int(float(os.getenv("THUMBNAIL_MAX_MB", "500")) * 1024 ** 2)
+EVICT_TO = 0.9  # Share of the budget left after trimming
+
+_digests = {}  # (path, size, mtime_ns) -> content digest, so reruns don't re-hash unchanged files
+_lock = threading.Lock()
+_size = {"dir": None, "bytes": 0}  # Running size of THUMBNAIL_DIR, seeded by the first scan
+
+
+def _content_digest(image_path):
+    stat = image_path.stat()
+    stat_key = (str(image_path), stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        digest = _digests.get(stat_key)
+    if digest is None:
+        with open(image_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with _lock:
+            _digests[stat_key] = digest
+    return digest
+
+
+def get_thumbnail(image_path, max_size=THUMBNAIL_SIZE):
+    """Path to a small WebP (or JPEG) preview of image_path, creating it on first use; None if the source is missing"""
+    image_path = Path(image_path)
+    if not image_path.exists():
+        return None
+    suffix = ".webp" if THUMBNAIL_FORMAT == "WEBP" else ".jpg"
+    thumb_path = THUMBNAIL_DIR / f"{_content_digest(image_path)}_{max_size}{suffix}"
+    if thumb_path.exists():
+        try:
+            os.utime(thumb_path)  # Mark as recently used for LRU eviction
+            return thumb_path
+        except FileNotFoundError:
+            pass  # Evicted between the check and the touch
+
+    with Image.open(image_path) as image:
+        image.draft("RGB", (max_size, max_size))  # Lets JPEG sources decode at reduced size
+        image = image.convert("RGB")
+        image.thumbnail((max_size, max_size))
+        THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=THUMBNAIL_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+            os.replace(tmp_path, thumb_path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+    _added(thumb_path)
+    return thumb_path
+
+
+def _added(thumb_path):
+    """Count a new thumbnail and trim the directory once the running total is over budget"""
+    with _lock:
+        if _size["dir"] == THUMBNAIL_DIR:
+            _size["bytes"] += thumb_path.stat().st_size
+            if _size["bytes"] <= MAX_THUMBNAIL_BYTES:
+                return
+    evict(int(MAX_THUMBNAIL_BYTES * EVICT_TO), keep=thumb_path)
+
+
+def evict(max_bytes=None, keep=None):
+    """Delete least-recently-used thumbnails (except keep) until the directory fits in max_bytes"""
+    max_bytes = MAX_THUMBNAIL_BYTES if max_bytes is None else max_bytes
+    with _lock:
+        entries = []
+        total = 0
+        for path in THUMBNAIL_DIR.glob("*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue  # About to be shown
+            path.unlink(missing_ok=True)
+            total -= size
+        _size.update(dir=THUMBNAIL_DIR, bytes=total)
+        return total
@@ -0,0 +1,158 @@
+"""Observed Veo operation latencies, used to decide when to poll.
+
+Every finished operation's latency is appended to a JSON-lines log (VEO_LATENCY_LOG), so the
+distribution survives restarts and can be inspected to tune the polling bounds. The log is
+rewritten with only the most recent MAX_SAMPLES entries per kind whenever it holds twice as
+many lines as those, so it stays small however many runs it has seen. Kinds are
+"initial" (first clip), "extension", "ready" (time from a clip finishing until it can be
+extended) and "download" (fetching the final clip).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+LATENCY_LOG = Path(os.getenv("VEO_LATENCY_LOG", "/mnt/user-data/cache/veo_latency.jsonl"))
+MAX_SAMPLES = 200  # Recent samples kept per kind, in memory and in the log
+MIN_SAMPLES = 5  # Fewer than this and polling falls back to plain backoff
+MIN_POLL_INTERVAL = 2.0  # Fastest polling, used while an operation is most likely to finish
+LOW_QUANTILE = 0.1  # No polls before this share of past operations had finished...
+HIGH_QUANTILE = 0.9  # ...and fast polling until this share had
+
+
+def _quantile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class LatencyTracker:
+    """Rolling latency samples per operation kind, persisted to LATENCY_LOG"""
+
+    def __init__(self, log_path=LATENCY_LOG):
+        self.log_path = Path(log_path)
+        self._samples = {}  # kind -> [seconds]
+        self._entries = {}  # kind -> [log entry], the lines a compacted log keeps
+        self._log_lines = 0  # Lines in the log file, compacted ones included
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.log_path.exists():
+            return
+        try:
+            with open(self.log_path, 'r') as f:
+                for line in f:
+                    self._log_lines += 1
+                    try:
+                        entry = json.loads(line)
+                        self._keep(entry['kind'], float(entry['seconds']), entry)
+                    except (ValueError, KeyError):
+                        continue  # Skip a partially written line
+        except OSError as e:
+            print(f"Could not read Veo latency log: {str(e)}")
+            return
+        if self._log_lines > sum(len(entries) for entries in self._entries.values()):
+            self._compact()
+
+    def _keep(self, kind, seconds, entry):
+        values = self._samples.setdefault(kind, [])
+        values.append(seconds)
+        del values[:-MAX_SAMPLES]
+        entries = self._entries.setdefault(kind, [])
+        entries.append(entry)
+        del entries[:-MAX_SAMPLES]
+
+    def _compact(self):
+        """Rewrite the log with only the entries still kept, oldest first"""
+        entries = sorted((e for kind_entries in self._entries.values() for e in kind_entries),
+                         key=lambda e: e.get('time') or 0)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.log_path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'w') as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in entries)
+            os.replace(tmp_path, self.log_path)
+        except OSError as e:
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)
+            print(f"Could not compact Veo latency log: {str(e)}")
+            return
+        self._log_lines = len(entries)
+
+    def record(self, kind, seconds, polls=None, scene_num=None):
+        """Add one finished operation's latency"""
+        with self._lock:
+            entry = {'time': time.time(), 'kind': kind, 'seconds': round(seconds, 2), 'polls': polls, 'scene': scene_num}
+            self._keep(kind, seconds, entry)
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Could not write Veo latency log: {str(e)}")
+                return
+            self._log_lines += 1
+            kept = sum(len(entries) for entries in self._entries.values())
+            if self._log_lines >= 2 * max(kept, MAX_SAMPLES):
+                self._compact()
+
+    def quantile(self, kind, q):
+        """Latency at quantile q for kind, or None without enough history"""
+        with self._lock:
+            values = sorted(self._samples.get(kind, []))
+        if len(values) < MIN_SAMPLES:
+            return None
+        return _quantile(values, q)
+
+    def quantiles(self, kind):
+        """(low, high) latency quantiles for kind, or None without enough history"""
+        low = self.quantile(kind, LOW_QUANTILE)
+        if low is None:
+            return None
+        return low, self.quantile(kind, HIGH_QUANTILE)
+
+    def next_poll_delay(self, kind, elapsed, max_interval):
+        """Seconds until an operation that has been running for elapsed seconds is worth checking.
+
+        Skip straight to where past operations started finishing, poll fast through the
+        range where most of them finished, then back off again for stragglers.
+        """
+        bounds = self.quantiles(kind)
+        if bounds is None:
+            # No history yet: start fast and back off in proportion to the time already spent
+            return max(MIN_POLL_INTERVAL, min(max_interval, elapsed * 0.25))
+        low, high = bounds
+        if elapsed < low:
+            return max(MIN_POLL_INTERVAL, low - elapsed)
+        if elapsed < high:
+            return MIN_POLL_INTERVAL
+        return max(MIN_POLL_INTERVAL, min(max_interval, (elapsed - high) * 0.25))
+
+    def stats(self):
+        """Per-kind sample count and quantiles, for display"""
+        with self._lock:
+            kinds = {kind: sorted(values) for kind, values in self._samples.items()}
+        return {
+            kind: {
+                'samples': len(values),
+                'p10': round(_quantile(values, 0.1), 1),
+                'p50': round(_quantile(values, 0.5), 1),
+                'p90': round(_quantile(values, 0.9), 1),
+            }
+            for kind, values in kinds.items() if values
+        }
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_latency_tracker():
+    """Process-wide LatencyTracker shared by every scheduler"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = LatencyTracker()
+        return _tracker
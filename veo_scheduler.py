@@ -0,0 +1,404 @@
+"""Run many Veo scene generations at once from a single polling loop"""
+import math
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import media_cache
+import run_metrics
+from rate_limit import get_limiter, is_rate_limit_error
+from video_download import download_video, get_download_pool
+from veo_latency import MIN_POLL_INTERVAL, get_latency_tracker
+
+VEO_MODEL = "veo-3.1-fast-generate-preview"
+INITIAL_SECONDS = 8  # Length of the first generated clip
+EXTENSION_SECONDS = 7  # Each extension adds this much
+MIN_SCENE_SECONDS = 8
+MAX_SCENE_SECONDS = 60
+DURATION_TOLERANCE = 0.5  # A shortfall this small is absorbed in the edit instead of paying for another extension
+EXTENSION_READY_TIMEOUT = 120  # Stop probing a finished clip for readiness and just try the extension
+MIN_SLEEP = 0.5  # Shortest pause of the scheduling loop
+
+_FILE_NAME = re.compile(r"files/([A-Za-z0-9_-]+)")
+_NOT_READY_MARKERS = ("not ready", "still processing", "failed_precondition", "not in an active state")
+
+NO_TEXT_INSTRUCTION = "IMPORTANT: Do not include any text, words, letters, or numbers in the video."
+
+# Extension prompt should describe continuation, not repeat original
+EXTEND_PROMPT = f"Continue this video naturally, maintaining the same visual style and mood. Keep the camera movement and composition consistent with what came before. {NO_TEXT_INSTRUCTION}"
+
+
+def estimate_scene_seconds(scene_text):
+    """Rough narration length from word count (2.5 words/second speaking rate)"""
+    return len(scene_text.split()) / 2.5
+
+
+def plan_scene_duration(scene_text, target_seconds=None):
+    """Return (target_seconds, extensions_needed) for a scene.
+
+    target_seconds is the scene's measured narration length when known; otherwise it is
+    estimated from the word count.
+    """
+    if target_seconds is None:
+        target_seconds = estimate_scene_seconds(scene_text)
+
+    # Clamp to reasonable bounds
+    target_seconds = max(MIN_SCENE_SECONDS, min(target_seconds, MAX_SCENE_SECONDS))
+
+    # Fewest extensions whose clips cover the target
+    remaining_seconds = target_seconds - DURATION_TOLERANCE - INITIAL_SECONDS
+    extensions_needed = max(0, math.ceil(remaining_seconds / EXTENSION_SECONDS))
+    return target_seconds, extensions_needed
+
+
+def is_not_ready_error(error):
+    """Extension rejected because the source clip is still being processed"""
+    message = str(error).lower()
+    return any(marker in message for marker in _NOT_READY_MARKERS)
+
+
+class SceneJob:
+    """State of one scene's initial generation + extension chain"""
+
+    def __init__(self, scene_num, prompt, scene_text, output_folder, target_seconds=None):
+        self.scene_num = scene_num
+        self.prompt = prompt
+        self.scene_text = scene_text
+        self.output_folder = output_folder
+        self.measured = target_seconds is not None  # Sized from the narration audio rather than word count
+        self.target_seconds, self.extensions_needed = plan_scene_duration(scene_text, target_seconds)
+        self.enhanced_prompt = f"{prompt}. {NO_TEXT_INSTRUCTION}"
+        self.planned_duration = INITIAL_SECONDS + self.extensions_needed * EXTENSION_SECONDS
+        self.cache_key = media_cache.cache_key(VEO_MODEL, self.enhanced_prompt, self.planned_duration)
+        self.cached = False
+
+        self.state = "queued"  # queued -> generating -> waiting/extending -> downloading -> done | failed
+        self.operation = None
+        self.download = None  # Future of the clip download running on the download pool
+        self.video = None
+        self.duration = 0
+        self.extensions_done = 0
+        self.ready_at = 0  # Earliest time the next request for this scene may be submitted
+        self.attempts = 0  # Rate-limit retries for the request currently being submitted
+        self.throttled_since = None  # First time the current request was held back by the limiter
+        self.submitted_at = None  # When the current operation went out
+        self.next_poll_at = 0  # When the current operation is next worth checking
+        self.polls = 0
+        self.clip_finished_at = None  # When the latest clip finished, while waiting to extend it
+        self.clip_ready = False  # Latest clip confirmed ready to extend
+        self.video_path = None
+        self.error = None
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed")
+
+    @property
+    def operation_kind(self):
+        return "initial" if self.state == "generating" else "extension"
+
+
+class VeoScheduler:
+    """Keep several scenes' Veo chains in flight and advance each one as soon as its operation completes.
+
+    Each operation is polled on its own schedule, derived from how long past operations of the
+    same kind took (see veo_latency); poll_interval is the longest gap between two polls.
+    Finished clips are downloaded on video_download's pool while the loop keeps generating;
+    files_client (clients.get_client("google_files", ...)) streams them straight to disk,
+    without one they go through the SDK's files.download.
+    Nothing in here calls Streamlit - progress is reported through status_callback / on_complete,
+    which run on the thread that calls run().
+    """
+
+    def __init__(self, client, max_in_flight=4, poll_interval=10, status_callback=None, on_complete=None,
+                 use_cache=True, cancel_event=None, files_client=None):
+        self.client = client
+        self.files_client = files_client
+        self.cancel_event = cancel_event  # threading.Event; once set, unfinished scenes are abandoned
+        self.use_cache = use_cache  # False forces a re-roll even when an identical clip is cached
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        self.limiter = get_limiter("veo")
+        self.latency = get_latency_tracker()
+        self.status_callback = status_callback
+        self.on_complete = on_complete
+        self.jobs = []
+
+    def add_scene(self, scene_num, prompt, scene_text, output_folder, target_seconds=None):
+        job = SceneJob(scene_num, prompt, scene_text, output_folder, target_seconds)
+        self.jobs.append(job)
+        return job
+
+    def _status(self, msg):
+        if self.status_callback:
+            self.status_callback(msg)
+
+    def _in_flight(self):
+        # A downloading scene no longer holds a Veo slot, so the next chain can start
+        return sum(1 for job in self.jobs if job.state not in ("queued", "downloading", "done", "failed"))
+
+    def _chain_limit(self):
+        """Scene chains allowed in flight - shrinks while Veo is returning 429s"""
+        return max(1, min(self.max_in_flight, self.limiter.stats()["concurrency_limit"]))
+
+    def _finish(self, job, error=None):
+        if error is not None:
+            job.state = "failed"
+            job.error = error
+            self._status(f"Scene {job.scene_num}: Failed - {error}")
+        else:
+            job.state = "done"
+        job.operation = None
+        if self.on_complete:
+            self.on_complete(job)
+
+    def _submit(self, job, make_request):
+        """Submit a request for a job; on rate limits, schedule a retry instead of blocking the loop"""
+        now = time.monotonic()
+        if not self.limiter.try_acquire():
+            if job.throttled_since is None:
+                job.throttled_since = now
+            return False  # Provider is throttled - try again on the next pass
+        run_metrics.count("veo", calls=1, queue_wait_s=now - (job.throttled_since or now))
+        job.throttled_since = None
+        try:
+            job.operation = make_request()
+        except Exception as e:
+            self.limiter.release()
+            if job.state == "waiting" and is_not_ready_error(e) and not self._ready_timed_out(job):
+                job.clip_ready = False
+                self._schedule_ready_probe(job)
+                self._status(f"Scene {job.scene_num}: Clip still processing, retrying extension shortly...")
+                return False
+            if not is_rate_limit_error(e):
+                self._finish(job, e)
+                return False
+            job.attempts += 1
+            delay = self.limiter.record_rate_limit(e, job.attempts)
+            run_metrics.count("veo", rate_limited=1)
+            if job.attempts >= self.limiter.max_retries:
+                self._status(f"Scene {job.scene_num}: Rate limit - max retries reached")
+                self._finish(job, e)
+                return False
+            self.limiter.retries += 1
+            run_metrics.count("veo", retries=1)
+            job.ready_at = time.monotonic() + delay
+            self._status(f"Scene {job.scene_num}: Rate limit hit. Retrying in {delay:.0f}s ({job.attempts}/{self.limiter.max_retries})...")
+            return False
+        self.limiter.release()
+        self.limiter.record_success()
+        job.attempts = 0
+        job.submitted_at = time.monotonic()
+        job.polls = 0
+        return True
+
+    def _schedule_poll(self, job):
+        now = time.monotonic()
+        elapsed = now - job.submitted_at
+        job.next_poll_at = now + self.latency.next_poll_delay(job.operation_kind, elapsed, self.poll_interval)
+
+    def _ready_timed_out(self, job):
+        return time.monotonic() - job.clip_finished_at >= EXTENSION_READY_TIMEOUT
+
+    def _schedule_ready_probe(self, job):
+        now = time.monotonic()
+        job.ready_at = now + self.latency.next_poll_delay("ready", now - job.clip_finished_at, self.poll_interval)
+
+    def _clip_ready(self, job):
+        """Probe whether the latest clip has finished processing and can be extended"""
+        match = _FILE_NAME.search(getattr(job.video, "uri", None) or "")
+        if not match:
+            return True  # Nothing to probe - let the extension request find out
+        try:
+            video_file = self.client.files.get(name=f"files/{match.group(1)}")
+        except Exception:
+            return True
+        state = getattr(video_file.state, "name", video_file.state)
+        return state in (None, "ACTIVE", "STATE_UNSPECIFIED")
+
+    def _use_cached(self, job):
+        """Finish a job straight from the media cache if an identical clip was generated before"""
+        video_path = job.output_folder / f"scene_{job.scene_num:02d}.mp4"
+        if not media_cache.fetch(job.cache_key, video_path):
+            return
+        job.cached = True
+        job.duration = job.planned_duration
+        job.video_path = video_path
+        self._status(f"Scene {job.scene_num}: Reused cached {job.duration}s video")
+        self._finish(job)
+
+    def _start_initial(self, job):
+        def make_initial_video():
+            return self.client.models.generate_videos(
+                model=VEO_MODEL,
+                prompt=job.enhanced_prompt,
+                config={"duration_seconds": INITIAL_SECONDS}
+            )
+
+        if job.state == "queued":
+            basis = "narration" if job.measured else f"{len(job.scene_text.split())} words"
+            self._status(f"Scene {job.scene_num}: {basis} → targeting {job.target_seconds:.1f}s, generating initial {INITIAL_SECONDS}s video...")
+            job.state = "starting"
+        if self._submit(job, make_initial_video):
+            job.state = "generating"
+            self._schedule_poll(job)
+
+    def _start_extension(self, job):
+        current_video = job.video
+
+        def make_extension():
+            return self.client.models.generate_videos(
+                model=VEO_MODEL,
+                video=current_video,
+                prompt=EXTEND_PROMPT,
+            )
+
+        if self._submit(job, make_extension):
+            # The extension was accepted, so the clip was ready by now
+            self.latency.record("ready", job.submitted_at - job.clip_finished_at, scene_num=job.scene_num)
+            run_metrics.record_span("veo_ready_wait", job.submitted_at - job.clip_finished_at, scene=job.scene_num)
+            job.state = "extending"
+            self._schedule_poll(job)
+            self._status(f"Scene {job.scene_num}: Extension {job.extensions_done + 1}/{job.extensions_needed}...")
+
+    def _operation_finished(self, job):
+        now = time.monotonic()
+        self.latency.record(job.operation_kind, now - job.submitted_at, polls=job.polls, scene_num=job.scene_num)
+        run_metrics.record_span(f"veo_{job.operation_kind}", now - job.submitted_at, scene=job.scene_num, polls=job.polls)
+        job.video = job.operation.response.generated_videos[0].video
+        if job.state == "generating":
+            job.duration = INITIAL_SECONDS
+        else:
+            job.extensions_done += 1
+            job.duration += EXTENSION_SECONDS
+        job.operation = None
+
+        if job.extensions_done < job.extensions_needed:
+            # The clip may still be processing server-side; probe it instead of sleeping blindly
+            job.state = "waiting"
+            job.clip_finished_at = now
+            job.clip_ready = False
+            job.ready_at = now
+            self._status(f"Scene {job.scene_num}: {job.duration}s so far, {job.extensions_needed - job.extensions_done} extension(s) to go")
+        else:
+            self._download(job)
+
+    def _download(self, job):
+        self._status(f"Scene {job.scene_num}: Downloading final {job.duration}s video...")
+        job.state = "downloading"
+        job.download = get_download_pool().submit(run_metrics.bind(self._fetch_video), job)
+
+    def _fetch_video(self, job):
+        """Runs on the download pool: put the finished clip in place and in the media cache"""
+        video_path = job.output_folder / f"scene_{job.scene_num:02d}.mp4"
+        uri = getattr(job.video, "uri", None) or ""
+        started = time.monotonic()
+        with run_metrics.span("veo_download", scene=job.scene_num):
+            if self.files_client is not None and uri.startswith("http"):
+                size = download_video(self.files_client, uri, video_path)
+            else:
+                # SDK fallback buffers the whole clip; still rename into place only once it's written
+                self.client.files.download(file=job.video)
+                temp_path = video_path.with_name(f"{video_path.name}.part")
+                job.video.save(str(temp_path))
+                os.replace(temp_path, video_path)
+                size = video_path.stat().st_size
+        self.latency.record("download", time.monotonic() - started, scene_num=job.scene_num)
+        run_metrics.count("veo", bytes=size)
+        media_cache.store(job.cache_key, video_path)
+        return video_path
+
+    def _collect_downloads(self):
+        """Finish every scene whose download has completed (on the loop thread, like every callback)"""
+        for job in self.jobs:
+            if job.state != "downloading" or not job.download.done():
+                continue
+            try:
+                job.video_path = job.download.result()
+            except Exception as e:
+                self._finish(job, e)
+                continue
+            self._finish(job)
+
+    def _advance_ready_jobs(self):
+        """Submit every request that is allowed to go out right now"""
+        now = time.monotonic()
+        for job in self.jobs:
+            if job.ready_at > now:
+                continue
+            if job.state == "starting":
+                self._start_initial(job)  # Retrying a rate-limited initial request
+            elif job.state == "waiting":
+                if not job.clip_ready:
+                    if self._clip_ready(job):
+                        job.clip_ready = True
+                    elif not self._ready_timed_out(job):
+                        self._schedule_ready_probe(job)
+                        continue
+                self._start_extension(job)
+
+        for job in self.jobs:
+            if self._in_flight() >= self._chain_limit():
+                break
+            if job.state == "queued":
+                self._start_initial(job)
+
+        waiting = [job for job in self.jobs if job.state in ("queued", "starting", "waiting")]
+        self.limiter.note_backlog(len(waiting))
+
+    def _poll_pending(self):
+        """Refresh every outstanding operation that is due for a check"""
+        now = time.monotonic()
+        for job in self.jobs:
+            if job.operation is None or job.state not in ("generating", "extending") or job.next_poll_at > now:
+                continue
+            try:
+                if not job.operation.done:
+                    job.operation = self.client.operations.get(job.operation)
+                    job.polls += 1
+                if job.operation.done:
+                    self._operation_finished(job)
+                else:
+                    self._schedule_poll(job)
+            except Exception as e:
+                self._finish(job, e)
+
+    def _next_wake(self):
+        """Monotonic time at which the next poll or submission is due"""
+        now = time.monotonic()
+        times = [job.next_poll_at for job in self.jobs if job.state in ("generating", "extending")]
+        times += [job.ready_at for job in self.jobs if job.state in ("starting", "waiting")]
+        if any(job.state == "queued" for job in self.jobs) and self._in_flight() < self._chain_limit():
+            times.append(now + MIN_POLL_INTERVAL)  # Held back by the rate limiter
+        return min(times) if times else now + self.poll_interval
+
+    def run(self):
+        """Drive all scenes to completion; returns the list of SceneJob results"""
+        if self.use_cache:
+            for job in self.jobs:
+                if job.state == "queued":
+                    self._use_cached(job)
+
+        while not all(job.finished for job in self.jobs):
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                for job in self.jobs:
+                    if not job.finished:
+                        if job.download is not None:
+                            job.download.cancel()  # Only stops downloads that haven't started
+                        self._finish(job, Exception("Cancelled"))
+                break
+            self._advance_ready_jobs()
+            self._poll_pending()
+            self._collect_downloads()
+            if not all(job.finished for job in self.jobs):
+                delay = min(self.poll_interval, max(MIN_SLEEP, self._next_wake() - time.monotonic()))
+                downloads = [job.download for job in self.jobs if job.state == "downloading"]
+                if downloads:
+                    wait(downloads, timeout=min(delay, 1.0), return_when=FIRST_COMPLETED)  # Wake when a clip lands
+                elif self.cancel_event is not None:
+                    self.cancel_event.wait(delay)  # Wake straight away on cancel
+                else:
+                    time.sleep(delay)
+        self.limiter.note_backlog(0)
+        return self.jobs
@@ -0,0 +1,133 @@
+"""Stream finished Veo clips to disk on a shared download pool.
+
+A clip is written in chunks to a .part file next to its destination and only renamed into
+place once its size matches what the server announced and it starts like an MP4, so a
+scene file on disk is always complete. A dropped connection resumes from the bytes already
+written (HTTP Range) instead of starting over.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))  # Clips downloaded at once, across all runs
+CHUNK_BYTES = 1024 * 1024
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 2  # Seconds before the first retry, doubled after each failed attempt
+TIMEOUT = (10, 60)  # (connect, read) seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class FilesClient:
+    """Authenticated GETs for clip downloads, with one requests.Session per thread.
+
+    requests.Session isn't documented as thread-safe, so each download worker gets its own
+    (keeping its connection pool across clips). The API key goes out with every request
+    rather than living on a shared session.
+    """
+
+    def __init__(self, api_key=None, make_session=requests.Session):
+        self._headers = {"x-goog-api-key": api_key} if api_key else {}
+        self._make_session = make_session
+        self._local = threading.local()
+
+    def get(self, url, headers=None, **kwargs):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._make_session()
+        return session.get(url, headers={**self._headers, **(headers or {})}, **kwargs)
+
+
+class DownloadError(Exception):
+    """Server answered, but not with a usable clip"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def part_path(dest, uri):
+    """Temp file for downloading uri into dest - stable across attempts so they can resume"""
+    dest = Path(dest)
+    tag = hashlib.sha1(uri.encode("utf-8")).hexdigest()[:12]
+    return dest.with_name(f"{dest.name}.{tag}.part")
+
+
+def _expected_size(response, offset):
+    """Full clip size from Content-Range ('bytes 100-999/1000'), else offset + Content-Length"""
+    content_range = response.headers.get("Content-Range", "")
+    total = content_range.rpartition("/")[2]
+    if total.isdigit():
+        return int(total)
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+
+def _fetch(files, uri, part):
+    """One attempt: append the rest of the clip to part; returns the expected total size"""
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with files.get(uri, headers=headers, stream=True, timeout=TIMEOUT) as response:
+        if response.status_code == 416:
+            part.unlink(missing_ok=True)  # Part is longer than the file - start over
+            raise DownloadError("Requested range not satisfiable")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise DownloadError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise DownloadError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
+        if offset and response.status_code != 206:
+            offset = 0  # Server ignored the Range header and is sending the whole file
+        expected = _expected_size(response, offset)
+        with open(part, 'ab' if offset else 'wb') as f:
+            for chunk in response.iter_content(chunk_size=CHUNK_BYTES):
+                f.write(chunk)
+    return expected
+
+
+def _verify(part, expected):
+    size = part.stat().st_size
+    if expected is not None and size < expected:
+        raise DownloadError(f"Incomplete download ({size} of {expected} bytes)")
+    if expected is not None and size > expected:
+        part.unlink()
+        raise DownloadError(f"Download larger than announced ({size} of {expected} bytes)")
+    with open(part, 'rb') as f:
+        header = f.read(12)
+    if header[4:8] != b"ftyp":
+        part.unlink()
+        raise DownloadError("Downloaded file is not an MP4")
+    return size
+
+
+def download_video(files, uri, dest):
+    """Stream uri into dest through files (a FilesClient) with resume and retries; returns the number of bytes written"""
+    dest = Path(dest)
+    part = part_path(dest, uri)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            expected = _fetch(files, uri, part)
+            size = _verify(part, expected)
+        except (requests.RequestException, DownloadError) as e:
+            if isinstance(e, DownloadError) and not e.retryable or attempt >= MAX_ATTEMPTS:
+                part.unlink(missing_ok=True)
+                raise Exception(f"Download failed after {attempt} attempt(s): {e}") from e
+            print(f"Download of {dest.name} interrupted ({e}), resuming (attempt {attempt + 1}/{MAX_ATTEMPTS})...")
+            time.sleep(RETRY_BACKOFF * (2 ** (attempt - 1)))
+            continue
+        os.replace(part, dest)  # Also leaves a hardlinked media-cache entry untouched
+        return size
+
+
+def get_download_pool():
+    """Process-wide thread pool for clip downloads, shared by every scheduler"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY, thread_name_prefix="veo-download")
+        return _pool